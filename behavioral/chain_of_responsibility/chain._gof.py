@@ -1,4 +1,17 @@
 import abc
+import asyncio
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+# requests r with low < r <= high
+Range = namedtuple('Range', 'low,high')
 
 
 class Handler(abc.ABC):
@@ -16,33 +29,331 @@ class Handler(abc.ABC):
     def _process_request(self, request):
         pass
 
-    def handle(self, request):
-        if self._can_handle(request):
+    def _process_requests(self, requests):
+        for request in requests:
             self._process_request(request)
-        elif self._successor:
-            self._successor.handle(request)
+
+    def handle(self, request):
+        """Pass the request down the chain - returns the handler that processed it, or None"""
+        handler = self
+        while handler is not None:
+            if handler._can_handle(request):
+                handler._process_request(request)
+                return handler
+            handler = handler._successor
+        return None
 
 
+class RangeHandler(Handler):
+    """Handler accepting the requests in a Range, which lets compile_chain index it"""
+
+    accepts = Range(0, 0)
 
-class ConcreteHandler1(Handler):
     def _can_handle(self, request):
-        return 0 < request <= 10
-    
+        return self.accepts.low < request <= self.accepts.high
+
+
+class _RangeTable:
+    """Sorted disjoint intervals (lows[i], highs[i]] owned by the first handler of the run accepting them"""
+
+    def __init__(self, handlers):
+        by_low = sorted(((handler.accepts, index, handler) for index, handler in enumerate(handlers)),
+                        key=lambda item: item[0].low)
+        points = sorted({point for handler in handlers for point in handler.accepts})
+        self.lows, self.highs, self.owners = [], [], []
+
+        # sweep the elementary intervals between consecutive points, keeping the
+        # handlers covering them in a heap ordered by their position in the chain
+        active, j = [], 0
+        for low, high in zip(points, points[1:]):
+            while j < len(by_low) and by_low[j][0].low <= low:
+                accepts, index, handler = by_low[j]
+                heapq.heappush(active, (index, accepts.high, handler))
+                j += 1
+            while active and active[0][1] < high:
+                heapq.heappop(active)
+            if not active:
+                continue
+
+            owner = active[0][2]
+            if self.owners and self.owners[-1] is owner and self.highs[-1] == low:
+                self.highs[-1] = high
+            else:
+                self.lows.append(low)
+                self.highs.append(high)
+                self.owners.append(owner)
+
+    def lookup(self, request):
+        i = bisect_left(self.highs, request)
+        if i < len(self.highs) and self.lows[i] < request:
+            return self.owners[i]
+        return None
+
+
+class Router:
+    """Routing table compiled from a chain - see compile_chain"""
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    def route(self, request):
+        """Return the handler the chain would pass the request to, or None"""
+        for segment in self.segments:
+            if isinstance(segment, _RangeTable):
+                handler = segment.lookup(request)
+                if handler is not None:
+                    return handler
+            elif segment._can_handle(request):
+                return segment
+        return None
+
+    def handle(self, request):
+        handler = self.route(request)
+        if handler is not None:
+            handler._process_request(request)
+        return handler
+
+    def group(self, requests):
+        """Route requests and group them by handler, keeping their order - unhandled ones under None"""
+        groups = {}
+        for request in requests:
+            groups.setdefault(self.route(request), []).append(request)
+        return groups
+
+    def handle_batch(self, requests):
+        groups = self.group(requests)
+        for handler, batch in groups.items():
+            if handler is not None:
+                handler._process_requests(batch)
+        return groups
+
+
+def _indexable(handler):
+    """True if the handler accepts exactly the requests in its Range"""
+    return (isinstance(handler, RangeHandler) and type(handler)._can_handle is RangeHandler._can_handle
+            and '_can_handle' not in vars(handler))
+
+
+def compile_chain(head):
+    """Compile the chain starting at head into a Router
+
+    Runs of consecutive RangeHandlers become one interval table searched with
+    bisect; other handlers - including RangeHandlers that override _can_handle -
+    are asked in chain order, as Handler.handle does. Compile again after
+    changing the chain.
+    """
+    segments, run = [], []
+    handler = head
+    while handler is not None:
+        if _indexable(handler):
+            run.append(handler)
+        else:
+            if run:
+                segments.append(_RangeTable(run))
+                run = []
+            segments.append(handler)
+        handler = handler._successor
+    if run:
+        segments.append(_RangeTable(run))
+
+    return Router(segments)
+
+
+class HandlerStats:
+    """Requests processed by one handler, with a latency histogram of power-of-two microsecond buckets"""
+
+    buckets = 32
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.blocked = 0.0  # time producers waited because the handler's queues were full
+        self.first = None
+        self.last = None
+        self.histogram = [0] * self.buckets
+
+    def record(self, start, end, count=1, failed=False):
+        elapsed = (end - start) / count
+        self.count += count
+        self.errors += count if failed else 0
+        self.busy += end - start
+        self.histogram[min(int(elapsed * 1e6).bit_length(), self.buckets - 1)] += count
+        self.first = start if self.first is None else min(self.first, start)
+        self.last = end if self.last is None else max(self.last, end)
+
+    def merge(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.busy += other.busy
+        self.blocked += other.blocked
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        if other.first is not None:
+            self.first = other.first if self.first is None else min(self.first, other.first)
+            self.last = other.last if self.last is None else max(self.last, other.last)
+
+    @property
+    def throughput(self):
+        """Requests per second between the first start and the last end"""
+        return self.count / (self.last - self.first) if self.count and self.last > self.first else 0.0
+
+    def percentile(self, q):
+        """Upper bound (seconds) of the latency bucket holding the q-th percentile"""
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= rank:
+                return (1 << bucket) / 1e6
+        return 0.0
+
+    def __repr__(self):
+        return (f'<HandlerStats count={self.count} errors={self.errors} throughput={self.throughput:.0f}/s '
+                f'p50<={self.percentile(50) * 1e6:.0f}us p99<={self.percentile(99) * 1e6:.0f}us '
+                f'blocked={self.blocked * 1e3:.1f}ms>')
+
+
+_STOP = object()
+
+
+def _process_batch(handler, batch):
+    handler._process_requests(batch)
+
+
+class _Lane:
+    """Bounded queue of one handler drained in order by one thread"""
+
+    def __init__(self, handler, capacity, batch_size, pool):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.pool = pool
+        self.stats = HandlerStats()
+        self.queue = queue.Queue(capacity)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, request):
+        try:
+            self.queue.put_nowait(request)
+        except queue.Full:
+            start = time.perf_counter()
+            self.queue.put(request)
+            self.stats.blocked += time.perf_counter() - start
+
+    def _run(self):
+        get, get_nowait, perf_counter = self.queue.get, self.queue.get_nowait, time.perf_counter
+        while (request := get()) is not _STOP:
+            if self.pool is None:
+                start = perf_counter()
+                try:
+                    self.handler._process_request(request)
+                except Exception:
+                    self.stats.record(start, perf_counter(), failed=True)
+                else:
+                    self.stats.record(start, perf_counter())
+                continue
+
+            batch, stop = [request], False
+            while len(batch) < self.batch_size:
+                try:
+                    request = get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stop = True
+                    break
+                batch.append(request)
+
+            start = perf_counter()
+            try:
+                self.pool.submit(_process_batch, self.handler, batch).result()
+            except Exception:
+                self.stats.record(start, perf_counter(), len(batch), failed=True)
+            else:
+                self.stats.record(start, perf_counter(), len(batch))
+            if stop:
+                break
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.thread.join()
+
+
+class ParallelDelegator:
+    """Fans routed requests out to `workers` lanes per handler
+
+    Requests with the same key(request) go to the same lane of their handler, so
+    they are processed in submission order; without key lanes are used round robin.
+    Lanes hold at most `capacity` requests - put() blocks when the lane of a slow
+    handler is full (the wait is reported as HandlerStats.blocked). With
+    processes=True lanes pass batches of requests to a process pool, so handlers
+    must be picklable.
+    """
+
+    def __init__(self, router, workers=4, key=None, capacity=1024, processes=False, batch_size=256):
+        self.router = router
+        self.workers = workers
+        self.key = key
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.unhandled = 0
+        self._pool = ProcessPoolExecutor(workers) if processes else None
+        self._lanes = {}
+        self._next = itertools.count()
+
+    def put(self, request):
+        handler = self.router.route(request)
+        if handler is None:
+            self.unhandled += 1
+            return
+
+        lanes = self._lanes.get(handler)
+        if lanes is None:
+            lanes = self._lanes[handler] = [_Lane(handler, self.capacity, self.batch_size, self._pool)
+                                            for _ in range(self.workers)]
+        index = next(self._next) if self.key is None else hash(self.key(request))
+        lanes[index % self.workers].put(request)
+
+    def close(self):
+        """Wait until every request has been processed"""
+        for lanes in self._lanes.values():
+            for lane in lanes:
+                lane.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def stats(self):
+        stats = {}
+        for handler, lanes in self._lanes.items():
+            stats[handler] = HandlerStats()
+            for lane in lanes:
+                stats[handler].merge(lane.stats)
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+
+class ConcreteHandler1(RangeHandler):
+    accepts = Range(0, 10)
+
     def _process_request(self, request):
         print('request {} handled in handler 1'.format(request))
 
 
-class ConcreteHandler2(Handler):
-    def _can_handle(self, request):
-        return 10 < request <= 20
-    
+class ConcreteHandler2(RangeHandler):
+    accepts = Range(10, 20)
+
     def _process_request(self, request):
         print('request {} handled in handler 2'.format(request))
 
-class ConcreteHandler3(Handler):
-    def _can_handle(self, request):
-        return 20 < request <= 30
-    
+class ConcreteHandler3(RangeHandler):
+    accepts = Range(20, 30)
+
     def _process_request(self, request):
         print('request {} handled in handler 3'.format(request))
 
@@ -67,10 +378,29 @@ class Client:
         h3.successor(h4)
 
         self.handlers = (h1, h2, h3, h4,)
+        self.router = compile_chain(h1)
 
-    def delegate(self, requests):
+    def delegate(self, requests, batch=False):
+        """Handle requests in order, or grouped by handler with batch=True"""
+        if batch:
+            return self.router.handle_batch(requests)
         for request in requests:
-            self.handlers[0].handle(request)
+            self.router.handle(request)
+
+    def delegate_parallel(self, requests, workers=4, key=None, capacity=1024, processes=False):
+        """Handle requests on worker threads (or processes) - see ParallelDelegator
+
+        Returns HandlerStats per handler.
+        """
+        with ParallelDelegator(self.router, workers, key, capacity, processes) as delegator:
+            for request in requests:
+                delegator.put(request)
+        return delegator.stats()
+
+    async def delegate_async(self, requests, **options):
+        """delegate_parallel without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.delegate_parallel, requests, **options))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,13 @@
+from collections import deque
 from copyreg import constructor
 from distutils.debug import DEBUG
 from distutils.log import INFO
+import json as jsonlib
 import logging
+import operator
+import re
+import threading
+import time
 from typing import List
 
 
@@ -14,16 +20,223 @@ class QueueHandler(logging.Handler):
         self._q.append(self.format(record))
 
 
+class BatchingQueueHandler(logging.Handler):
+    """Hands raw records to a background thread that formats and writes them in batches
+
+    Records wait in a bounded buffer of `capacity` records. When it is full, emit()
+    drops the record (overflow='drop', counted in `dropped`) or waits for space
+    (overflow='block'). The thread wakes up every `batch_size` records (or after
+    `interval` seconds), formats the batch with the target's formatter and writes
+    it to the target stream with a single write and flush. Records are formatted
+    late, so their args must not be mutated after logging.
+
+    The writer thread shares the GIL with the logging threads. With CompiledFormatter
+    it manages about 350k records/s alone, but only 100-150k/s while four threads
+    log flat out. 'drop' therefore absorbs bursts that outrun the writer by at most
+    `capacity` records: of 10**6 records logged from four threads at once about 90%
+    are dropped with the defaults (see chain_logger_benchmark.py). Use 'block' if
+    every record matters.
+    """
+
+    def __init__(self, target: logging.StreamHandler, capacity=65536, overflow='drop', batch_size=4096,
+                 interval=0.05):
+        super().__init__()
+        if overflow not in ('drop', 'block'):
+            raise ValueError(f"overflow must be 'drop' or 'block', not {overflow!r}")
+        self.target = target
+        self.capacity = capacity
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._buffer = deque()
+        self._wakeup = threading.Event()
+        self._not_full = threading.Condition()
+        self._blocked = 0
+        self._drain_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def handle(self, record):
+        # no handler lock - deque.append is thread safe
+        if self.filters and not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def emit(self, record):
+        buffer = self._buffer
+        if len(buffer) >= self.capacity:
+            if self.overflow == 'drop':
+                self.dropped += 1
+                return
+            self._wait_for_space()
+
+        buffer.append(record)
+        if len(buffer) == self.batch_size:
+            self._wakeup.set()
+
+    def _wait_for_space(self):
+        with self._not_full:
+            self._blocked += 1
+            self._wakeup.set()
+            while len(self._buffer) >= self.capacity:
+                self._not_full.wait(self.interval)
+            self._blocked -= 1
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self._drain()
+
+    def _drain(self):
+        buffer, popleft = self._buffer, self._buffer.popleft
+        target = self.target
+
+        with self._drain_lock:
+            while buffer:
+                batch = [popleft() for _ in range(min(len(buffer), self.batch_size))]
+                if self._blocked:
+                    with self._not_full:
+                        self._not_full.notify_all()
+
+                batch = [record for record in batch if record.levelno >= target.level and target.filter(record)]
+                try:
+                    self._write(batch)
+                except Exception:
+                    for record in batch:
+                        self.handleError(record)
+
+    def _write(self, batch):
+        target = self.target
+        if not batch:
+            return
+
+        terminator = target.terminator
+        text = terminator.join(map(target.format, batch)) + terminator
+        with target.lock:
+            if target.stream is None:
+                target.stream = target._open()
+            target.stream.write(text)
+            target.stream.flush()
+
+    def flush(self):
+        """Write out every record emitted so far"""
+        self._drain()
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self._drain()
+        self.target.flush()
+        super().close()
+
+
+_EVEN_DIGITS = frozenset('02468')
+
+
 class EvenFilter(logging.Filter):
     def __init__(self):
         super().__init__()
 
     def filter(self, record: logging.LogRecord):
-        no = record.msg.split(maxsplit=1)[0]
-        return int(no) % 2 == 0
+        # the number is even when the last digit of the first word is
+        words = record.msg.split(None, 1)
+        return bool(words) and words[0][-1:] in _EVEN_DIGITS
 
 
-class ExclamationMarkFormatter(logging.Formatter):
+_FIELD = re.compile(r'%%|%\((\w+)\)')
+
+
+class CompiledFormatter(logging.Formatter):
+    """Formatter with a precompiled %-style template and a per-second timestamp cache
+
+    The template is turned into a positional one filled from an attrgetter, so
+    records are not rendered through their __dict__, and time.strftime runs once
+    per second of record timestamps. With json=True every record is rendered as
+    one JSON object holding the template fields (plus exc_info/stack_info).
+    """
+
+    def __init__(self, fmt=None, datefmt=None, style='%', validate=True, json=False):
+        super().__init__(fmt, datefmt, style, validate)
+        if style != '%':
+            raise ValueError('CompiledFormatter only supports %-style templates')
+
+        self.json = json
+        self.fields = [field for field in _FIELD.findall(self._fmt) if field]
+        self._uses_time = 'asctime' in self.fields
+        self._time_cache = (None, '')
+        self._render = self._compile()
+        self._dumps = jsonlib.JSONEncoder(ensure_ascii=False, default=str).encode
+
+    def _compile(self):
+        fields = self.fields
+        if not fields:
+            getter = lambda record: ()
+        elif len(fields) == 1:
+            field = fields[0]
+            getter = lambda record: (getattr(record, field),)
+        else:
+            getter = operator.attrgetter(*fields)
+
+        if self.json:
+            return lambda record: dict(zip(fields, getter(record)))
+
+        template = _FIELD.sub(lambda match: '%' if match.group(1) else '%%', self._fmt)
+        return lambda record: template % getter(record)
+
+    def formatTime(self, record, datefmt=None):
+        key = (int(record.created), datefmt)
+        cached_key, text = self._time_cache
+        if key != cached_key:
+            text = time.strftime(datefmt or self.default_time_format, self.converter(record.created))
+            self._time_cache = (key, text)
+
+        if datefmt or not self.default_msec_format:
+            return text
+        return self.default_msec_format % (text, record.msecs)
+
+    def format(self, record):
+        record.message = record.getMessage()
+        if self._uses_time:
+            record.asctime = self.formatTime(record, self.datefmt)
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        try:
+            rendered = self._render(record)
+        except AttributeError:
+            # same error as the stock formatter gives for a field the record lacks
+            missing = [field for field in self.fields if not hasattr(record, field)]
+            if not missing:
+                raise
+            raise ValueError(f'Formatting field not found in record: {missing[0]!r}') from None
+
+        if self.json:
+            values = rendered
+            if record.exc_text:
+                values['exc_info'] = record.exc_text
+            if record.stack_info:
+                values['stack_info'] = self.formatStack(record.stack_info)
+            return self._dumps(values)
+
+        text = rendered
+        if record.exc_text:
+            if text[-1:] != '\n':
+                text = text + '\n'
+            text = text + record.exc_text
+        if record.stack_info:
+            if text[-1:] != '\n':
+                text = text + '\n'
+            text = text + self.formatStack(record.stack_info)
+        return text
+
+
+class ExclamationMarkFormatter(CompiledFormatter):
 
     def __init__(self):
         super().__init__()
@@ -32,10 +245,10 @@ class ExclamationMarkFormatter(logging.Formatter):
         return super().format(record) + "!!!"    
 
 
-class BetterTimeFormatter(logging.Formatter):
+class BetterTimeFormatter(CompiledFormatter):
 
-    def __init__(self, fmt=None, datefmt=None, style='%', validate=True):
-        super().__init__(fmt, datefmt, style, validate)
+    def __init__(self, fmt=None, datefmt=None, style='%', validate=True, json=False):
+        super().__init__(fmt, datefmt, style, validate, json)
 
     def formatTime(self, record, datefmt) -> str:
         return "<<" + super().formatTime(record, datefmt) + ">>"
@@ -0,0 +1,73 @@
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from chain_logger import BatchingQueueHandler, CompiledFormatter, EvenFilter
+
+
+def make_records(count):
+    return [logging.LogRecord('bench', logging.INFO, __file__, 1, '%d - message %s', (i, 'x'), None)
+            for i in range(count)]
+
+
+def run(handler, records, threads):
+    chunks = [records[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=lambda chunk=chunk: list(map(handler.handle, chunk))) for chunk in chunks]
+
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    emitted = time.perf_counter() - start
+    handler.flush()
+    written = time.perf_counter() - start
+
+    return emitted, written
+
+
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def format_records(formatter, records):
+    start = time.perf_counter()
+    for record in records:
+        formatter.format(record)
+    return time.perf_counter() - start
+
+
+def main(count, threads):
+    records = make_records(count)
+
+    for name, formatter in [('Formatter', logging.Formatter(FORMAT)), ('CompiledFormatter', CompiledFormatter(FORMAT)),
+                            ('CompiledFormatter, json', CompiledFormatter(FORMAT, json=True))]:
+        print(f'{name:>24}: {count / format_records(formatter, records):12,.0f} records/s formatted')
+
+    formatter = CompiledFormatter(FORMAT)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, overflow in [('FileHandler', None), ('Batching, drop', 'drop'), ('Batching, block', 'block')]:
+            target = logging.FileHandler(os.path.join(tmp, f'{overflow}.log'))
+            target.setFormatter(formatter)
+            handler = target if overflow is None else BatchingQueueHandler(target, overflow=overflow)
+
+            emitted, written = run(handler, records, threads)
+            dropped = getattr(handler, 'dropped', 0)
+            print(f'{name:>24}: {count / emitted:12,.0f} records/s emitted on {threads} threads, '
+                  f'{(count - dropped) / written:10,.0f} records/s written, {dropped} dropped')
+            handler.close()
+            target.close()
+
+    even_filter = EvenFilter()
+    start = time.perf_counter()
+    for record in records:
+        even_filter.filter(record)
+    print(f'{"EvenFilter":>24}: {count / (time.perf_counter() - start):12,.0f} records/s')
+
+
+if __name__ == '__main__':
+    main(int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**6,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 4)
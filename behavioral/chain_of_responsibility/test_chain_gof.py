@@ -0,0 +1,197 @@
+import asyncio
+import importlib.util
+import os
+import random
+import sys
+import threading
+import time
+
+spec = importlib.util.spec_from_file_location('chain_gof', os.path.join(os.path.dirname(__file__), 'chain._gof.py'))
+chain_gof = importlib.util.module_from_spec(spec)
+sys.modules['chain_gof'] = chain_gof  # lets process pools unpickle handlers
+spec.loader.exec_module(chain_gof)
+
+Range, RangeHandler, Handler, compile_chain = (chain_gof.Range, chain_gof.RangeHandler, chain_gof.Handler,
+                                               chain_gof.compile_chain)
+
+
+class Recording(RangeHandler):
+    def __init__(self, accepts):
+        super().__init__()
+        self.accepts = accepts
+        self.processed = []
+
+    def _process_request(self, request):
+        self.processed.append(request)
+
+    def _process_requests(self, requests):
+        self.processed.append(tuple(requests))
+
+
+class Divisible(Handler):
+    def __init__(self, divisor):
+        super().__init__()
+        self.divisor = divisor
+
+    def _can_handle(self, request):
+        return request % self.divisor == 0
+
+    def _process_request(self, request):
+        pass
+
+
+def link(handlers):
+    for handler, successor in zip(handlers, handlers[1:]):
+        handler.successor(successor)
+    return handlers[0]
+
+
+def walk(head, request):
+    handler = head
+    while handler is not None and not handler._can_handle(request):
+        handler = handler._successor
+    return handler
+
+
+def test_router_agrees_with_chain_walk():
+    rng = random.Random(7)
+    for _ in range(50):
+        handlers = []
+        for _ in range(rng.randint(1, 12)):
+            if rng.random() < 0.2:
+                handlers.append(Divisible(rng.randint(2, 9)))
+            else:
+                low = rng.randint(-50, 50)
+                handlers.append(Recording(Range(low, low + rng.randint(0, 30))))
+        head = link(handlers)
+        router = compile_chain(head)
+
+        for request in range(-60, 90):
+            assert router.route(request) is walk(head, request)
+        assert router.route(0.5) is walk(head, 0.5)
+
+
+class OddOnly(Recording):
+    def _can_handle(self, request):
+        return super()._can_handle(request) and request % 2
+
+
+def test_range_handler_overriding_can_handle_is_not_indexed():
+    odd, catch_all = OddOnly(Range(0, 10)), Recording(Range(-100, 100))
+    head = link([odd, catch_all])
+    router = compile_chain(head)
+
+    for request in range(-5, 15):
+        assert router.route(request) is walk(head, request)
+    assert router.route(4) is catch_all and router.route(3) is odd
+
+
+def test_long_chain_without_recursion():
+    handlers = [Recording(Range(i, i + 1)) for i in range(50_000)]
+    head = link(handlers)
+
+    assert head.handle(49_999.5) is handlers[-1]
+    assert head.handle(-1) is None
+
+    router = compile_chain(head)
+    assert len(router.segments) == 1
+    assert router.route(12_345) is handlers[12_344]
+
+
+def test_client_batch_delegation(capsys):
+    client = chain_gof.Client()
+    client.delegate([2, 14, 35], batch=False)
+    assert capsys.readouterr().out.splitlines() == ['request 2 handled in handler 1', 'request 14 handled in handler 2',
+                                                    'end of chain, no handler for 35']
+
+    groups = client.delegate([2, 5, 14, 22, 18, 3, 35], batch=True)
+    h1, h2, h3, default = client.handlers
+    assert groups == {h1: [2, 5, 3], h2: [14, 18], h3: [22], default: [35]}
+    assert capsys.readouterr().out.splitlines()[:3] == ['request 2 handled in handler 1',
+                                                        'request 5 handled in handler 1',
+                                                        'request 3 handled in handler 1']
+
+
+def test_handle_batch_calls_process_requests_once_per_handler():
+    low, high = Recording(Range(0, 10)), Recording(Range(10, 20))
+    router = compile_chain(link([low, high]))
+    groups = router.handle_batch([1, 11, 2, 25])
+
+    assert low.processed == [(1, 2)] and high.processed == [(11,)]
+    assert groups[None] == [25]
+
+
+class Collecting(RangeHandler):
+    def __init__(self, accepts, delay=0.0):
+        super().__init__()
+        self.accepts = accepts
+        self.delay = delay
+        self.seen = []
+        self.lock = threading.Lock()
+
+    def _process_request(self, request):
+        if self.delay:
+            time.sleep(self.delay)
+        if request == 13:
+            raise ValueError(request)
+        with self.lock:
+            self.seen.append(request)
+
+
+def test_parallel_delegation_keeps_per_key_order():
+    handlers = [Collecting(Range(0, 1000)), Collecting(Range(1000, 2000))]
+    router = compile_chain(link(handlers))
+    requests = [i for i in range(1, 2000) if i != 13] + [5000]
+
+    with chain_gof.ParallelDelegator(router, workers=4, key=lambda request: request % 3) as delegator:
+        for request in requests:
+            delegator.put(request)
+
+    assert delegator.unhandled == 1
+    for handler in handlers:
+        assert sorted(handler.seen) == [r for r in requests if handler._can_handle(r)]
+        for residue in range(3):
+            keyed = [r for r in handler.seen if r % 3 == residue]
+            assert keyed == sorted(keyed)
+
+    stats = delegator.stats()
+    assert stats[handlers[0]].count == 999 and stats[handlers[1]].count == 999
+    assert sum(stats[handlers[0]].histogram) == 999
+    assert stats[handlers[0]].throughput > 0
+    assert 0 < stats[handlers[0]].percentile(50) <= stats[handlers[0]].percentile(99)
+
+
+def test_errors_are_counted():
+    handler = Collecting(Range(0, 100))
+    with chain_gof.ParallelDelegator(compile_chain(handler), workers=2) as delegator:
+        for request in [12, 13, 14]:
+            delegator.put(request)
+    stats = delegator.stats()
+    assert (stats[handler].count, stats[handler].errors) == (3, 1)
+
+
+def test_slow_handler_applies_backpressure():
+    slow, fast = Collecting(Range(0, 10), delay=0.002), Collecting(Range(10, 20))
+    router = compile_chain(link([slow, fast]))
+
+    with chain_gof.ParallelDelegator(router, workers=1, capacity=2) as delegator:
+        for i in range(20):
+            delegator.put(1 + i % 9)
+            delegator.put(11)
+
+    stats = delegator.stats()
+    assert stats[slow].blocked > 0.01
+    assert stats[fast].blocked < stats[slow].blocked / 10
+    assert len(slow.seen) == len(fast.seen) == 20
+
+
+def test_delegate_async_and_processes(capsys):
+    client = chain_gof.Client()
+    stats = asyncio.run(client.delegate_async([2, 5, 14, 35], workers=2))
+    h1, h2, _, default = client.handlers
+    assert (stats[h1].count, stats[h2].count, stats[default].count) == (2, 1, 1)
+    capsys.readouterr()
+
+    stats = client.delegate_parallel(range(1, 31), workers=2, processes=True)
+    assert sum(s.count for s in stats.values()) == 30
+    assert not any(s.errors for s in stats.values())
@@ -0,0 +1,156 @@
+import json
+import logging
+import sys
+import threading
+import time
+
+import pytest
+
+from chain_logger import BatchingQueueHandler, BetterTimeFormatter, CompiledFormatter, EvenFilter
+
+
+def record(msg, level=logging.INFO):
+    return logging.LogRecord('test', level, __file__, 1, msg, None, None)
+
+
+def file_target(tmp_path, level=logging.NOTSET):
+    target = logging.FileHandler(tmp_path / 'out.log', delay=True)
+    target.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    target.setLevel(level)
+    return target
+
+
+def test_even_filter():
+    even_filter = EvenFilter()
+    assert even_filter.filter(record('12 - message'))
+    assert not even_filter.filter(record('7 - message'))
+    assert even_filter.filter(record('4'))
+    assert even_filter.filter(record('4\tx'))
+    assert even_filter.filter(record(' 4 x'))
+    assert not even_filter.filter(record(' 3\n4'))
+    assert not even_filter.filter(record(''))
+
+
+def test_records_are_written_in_order(tmp_path):
+    target = file_target(tmp_path, logging.INFO)
+    handler = BatchingQueueHandler(target, batch_size=7)
+    for i in range(100):
+        handler.handle(record(f'{i}', logging.DEBUG if i % 10 == 0 else logging.INFO))
+    handler.close()
+
+    lines = (tmp_path / 'out.log').read_text().splitlines()
+    assert lines == [f'INFO {i}' for i in range(100) if i % 10]
+
+
+def test_handler_filters_run_on_the_caller_thread(tmp_path):
+    handler = BatchingQueueHandler(file_target(tmp_path))
+    handler.addFilter(EvenFilter())
+    for i in range(10):
+        handler.handle(record(f'{i} - message'))
+    handler.flush()
+
+    assert (tmp_path / 'out.log').read_text().splitlines() == [f'INFO {i} - message' for i in range(0, 10, 2)]
+    handler.close()
+
+
+def test_drop_policy_counts_dropped_records(tmp_path):
+    handler = BatchingQueueHandler(file_target(tmp_path), capacity=10, interval=60)
+    for i in range(25):
+        handler.handle(record(str(i)))
+    assert handler.dropped == 15
+    handler.close()
+
+    assert len((tmp_path / 'out.log').read_text().splitlines()) == 10
+
+
+def test_block_policy_keeps_every_record(tmp_path):
+    handler = BatchingQueueHandler(file_target(tmp_path), capacity=16, overflow='block', batch_size=4)
+    threads = [threading.Thread(target=lambda t=t: [handler.handle(record(f'{t}-{i}')) for i in range(500)])
+               for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    handler.close()
+
+    lines = (tmp_path / 'out.log').read_text().splitlines()
+    assert handler.dropped == 0
+    assert len(lines) == 2000
+    for t in range(4):
+        assert [line for line in lines if line.startswith(f'INFO {t}-')] == [f'INFO {t}-{i}' for i in range(500)]
+
+
+def test_invalid_overflow(tmp_path):
+    with pytest.raises(ValueError):
+        BatchingQueueHandler(file_target(tmp_path), overflow='spill')
+
+
+FORMAT = '-- %(asctime)s - %(name)s - %(levelname)-8s - %(message)s %%'
+
+
+def test_compiled_formatter_matches_stock_formatter():
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        exc_info = sys.exc_info()
+    records = [logging.LogRecord('test', logging.INFO, __file__, 1, '%d - message', (i,), None) for i in range(3)]
+    records.append(logging.LogRecord('test', logging.ERROR, __file__, 1, 'failed', None, exc_info))
+
+    for datefmt in [None, '%H:%M:%S']:
+        for record in records:
+            assert CompiledFormatter(FORMAT, datefmt).format(record) == logging.Formatter(FORMAT, datefmt).format(record)
+
+
+def test_timestamp_is_cached_per_second(monkeypatch):
+    formatter = BetterTimeFormatter(FORMAT)
+    calls = []
+    monkeypatch.setattr(formatter, 'converter', lambda created: calls.append(created) or time.localtime(created))
+
+    records = [record(str(i)) for i in range(3)]
+    for i, created in enumerate([1000.25, 1000.75, 1001.5]):
+        records[i].created, records[i].msecs = created, created % 1 * 1000
+        assert formatter.format(records[i]).startswith('-- <<')
+
+    assert calls == [1000.25, 1001.5]
+    assert records[0].asctime[:-6] == records[1].asctime[:-6] != records[2].asctime[:-6]
+    assert records[1].asctime.endswith(',750>>')
+
+
+def test_timestamp_cache_is_keyed_on_datefmt():
+    formatter = CompiledFormatter(FORMAT)
+    log_record = record('message')
+    log_record.created = 1000.25
+
+    assert formatter.formatTime(log_record, '%Y') == time.strftime('%Y', time.localtime(1000.25))
+    assert formatter.formatTime(log_record, '%S') == time.strftime('%S', time.localtime(1000.25))
+    assert formatter.formatTime(log_record) == logging.Formatter(FORMAT).formatTime(log_record)
+
+
+def test_json_lines():
+    formatter = CompiledFormatter('%(name)s %(levelname)s %(message)s', json=True)
+    line = formatter.format(logging.LogRecord('test', logging.INFO, __file__, 1, 'x\n%s', ('y',), None))
+    assert '\n' not in line
+    assert json.loads(line) == {'name': 'test', 'levelname': 'INFO', 'message': 'x\ny'}
+
+
+def test_template_without_fields():
+    log_record = record('message')
+    for fmt in ['static', '100%% static']:
+        expected = logging.Formatter(fmt, validate=False).format(log_record)
+        assert CompiledFormatter(fmt, validate=False).format(log_record) == expected
+    assert CompiledFormatter('static', validate=False, json=True).format(log_record) == '{}'
+
+
+def test_missing_field_raises_like_the_stock_formatter():
+    fmt = '%(message)s %(user)s'
+    with pytest.raises(ValueError) as stock:
+        logging.Formatter(fmt).format(record('message'))
+    for json_lines in [False, True]:
+        with pytest.raises(ValueError) as compiled:
+            CompiledFormatter(fmt, json=json_lines).format(record('message'))
+        assert str(compiled.value) == str(stock.value)
+
+
+def test_other_styles_are_rejected():
+    with pytest.raises(ValueError):
+        CompiledFormatter('{message}', style='{')
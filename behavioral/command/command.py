@@ -2,7 +2,14 @@ import abc
 import os
 import copy
 
-history = []
+from command_history import CommandHistory
+
+history = CommandHistory(max_entries=100)
+
+
+def backup_name(filename):
+    head, tail = os.path.split(filename)
+    return os.path.join(head, '~' + tail)
 
 
 class Command(abc.ABC):
@@ -13,6 +20,10 @@ class Command(abc.ABC):
         """Method to execute the command"""
         pass
 
+    def paths(self):
+        """Paths the command touches - None if it may touch anything"""
+        return None
+
 
 class UndoableCommand(Command):
     def __init__(self, history):
@@ -26,21 +37,35 @@ class UndoableCommand(Command):
     def clone(self):
         return copy.copy(self)
 
+    def __copy__(self):
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        return clone
+
+    def __getstate__(self):
+        # history is re-attached when the command is paged back in from a journal
+        state = self.__dict__.copy()
+        state['history'] = None
+        return state
+
 
 class LsCommand(Command):
     """Concrete command that emulates ls unix command behavior"""
 
-    def __init__(self, path):
+    def __init__(self, path, output=print):
         self.path = path
+        self.output = output
 
-    def execute(self):
-        filenames = []
+    def paths(self):
+        # listing depends on every file in the directory - run it as a barrier
+        return None
 
-        for filename in os.listdir(self.path):
-            if os.path.isfile(os.path.join(self.path, filename)):
-                filenames.append(filename)
+    def execute(self):
+        with os.scandir(self.path) as entries:
+            filenames = [entry.name for entry in entries if entry.is_file()]
 
-        print('Content of dir:', ' '.join(filenames))
+        self.output('Content of dir: ' + ' '.join(filenames))
+        return filenames
 
 
 class TouchCommand(UndoableCommand):
@@ -49,8 +74,17 @@ class TouchCommand(UndoableCommand):
     def __init__(self, history, filename):
         super().__init__(history)
         self.filename = filename
+        self.previous_times = None
+
+    def paths(self):
+        return (os.path.abspath(self.filename),)
 
     def execute(self):
+        try:
+            stat = os.stat(self.filename)
+            self.previous_times = (stat.st_atime_ns, stat.st_mtime_ns)
+        except FileNotFoundError:
+            self.previous_times = None
         self.history.append(self.clone())
 
         """Actual implementation of unix touch command."""
@@ -58,8 +92,11 @@ class TouchCommand(UndoableCommand):
             os.utime(self.filename, None)
 
     def undo(self):
-        """Undo unix touch command. Here we simply delete the file."""
-        os.remove(self.filename)
+        """Undo unix touch command. Delete the file if touch created it, otherwise restore its times."""
+        if self.previous_times is None:
+            os.remove(self.filename)
+        else:
+            os.utime(self.filename, ns=self.previous_times)
 
 
 class RmCommand(UndoableCommand):
@@ -70,8 +107,11 @@ class RmCommand(UndoableCommand):
         self.filename = filename
         self.backup_name = ''
 
+    def paths(self):
+        return (os.path.abspath(self.filename), os.path.abspath(backup_name(self.filename)))
+
     def execute(self):
-        self.backup_name = '~' + self.filename
+        self.backup_name = backup_name(self.filename)
         self.history.append(self.clone())
 
         """Deletes file with creating backup to restore it in undo method."""
@@ -123,10 +163,16 @@ def main():
 
     # undo commands
 
-    for cmd in reversed(history):
-        cmd.undo()
+    while history.undo():
+        pass
+
+    btn_ls.on_click()
+
+    print("Redo " + '*' * 40)
 
+    history.redo()
     btn_ls.on_click()
+    history.undo()
 
 
 if __name__ == '__main__':
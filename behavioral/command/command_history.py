@@ -0,0 +1,186 @@
+from array import array
+import os
+import pickle
+import struct
+import sys
+import threading
+
+_RECORD_HEADER = struct.Struct('<I')
+
+
+def _sizeof(command):
+    return sys.getsizeof(command) + sys.getsizeof(command.__dict__)
+
+
+class CommandJournal:
+    """Append-only file of pickled commands used as a stack of the oldest history entries"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w+b')
+        self._offsets = array('q')
+        self._live_bytes = 0
+
+    def push(self, command):
+        data = pickle.dumps(command, pickle.HIGHEST_PROTOCOL)
+        self._file.seek(0, os.SEEK_END)
+        self._offsets.append(self._file.tell())
+        self._file.write(_RECORD_HEADER.pack(len(data)) + data)
+        self._live_bytes += _RECORD_HEADER.size + len(data)
+
+    def pop(self):
+        offset = self._offsets.pop()
+        self._file.seek(offset)
+        size, = _RECORD_HEADER.unpack(self._file.read(_RECORD_HEADER.size))
+        command = pickle.loads(self._file.read(size))
+        self._live_bytes -= _RECORD_HEADER.size + size
+
+        if not self._offsets:
+            self._file.truncate(0)
+        elif self.garbage_bytes() > self._live_bytes:
+            self.compact()
+
+        return command
+
+    def garbage_bytes(self):
+        self._file.seek(0, os.SEEK_END)
+        return self._file.tell() - self._live_bytes
+
+    def compact(self):
+        """Rewrite the journal keeping only live records"""
+        self._file.seek(0)
+        records = []
+        for offset in self._offsets:
+            self._file.seek(offset)
+            size, = _RECORD_HEADER.unpack(self._file.read(_RECORD_HEADER.size))
+            records.append(self._file.read(size))
+
+        self._file.seek(0)
+        self._file.truncate(0)
+        self._offsets = array('q')
+        for data in records:
+            self._offsets.append(self._file.tell())
+            self._file.write(_RECORD_HEADER.pack(len(data)) + data)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def close(self):
+        self._file.close()
+        os.remove(self.path)
+
+
+class CommandHistory:
+    """Bounded undo/redo history
+
+    The newest max_entries commands (at most max_bytes of them) are kept in a ring
+    buffer. Older ones are spilled to a CommandJournal when journal_path is given
+    and paged back in by undo(), otherwise they are forgotten.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=None, journal_path=None, sizeof=_sizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.journal = CommandJournal(journal_path) if journal_path else None
+        self.dropped = 0
+        self._ring = [None] * max_entries
+        self._sizes = array('q', bytes(8 * max_entries))
+        self._head = 0
+        self._count = 0
+        self._nbytes = 0
+        self._redo = []
+        self._redoing = False
+        self._lock = threading.RLock()
+
+    def append(self, command):
+        with self._lock:
+            self._append(command)
+
+    def _append(self, command):
+        if not self._redoing:
+            self._redo.clear()
+
+        if self._count == self.max_entries:
+            self._evict_oldest()
+
+        size = self.sizeof(command)
+        index = (self._head + self._count) % self.max_entries
+        self._ring[index] = command
+        self._sizes[index] = size
+        self._count += 1
+        self._nbytes += size
+
+        while self.max_bytes is not None and self._nbytes > self.max_bytes and self._count > 1:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        command = self._ring[self._head]
+        self._ring[self._head] = None
+        self._nbytes -= self._sizes[self._head]
+        self._head = (self._head + 1) % self.max_entries
+        self._count -= 1
+
+        if self.journal is not None:
+            self.journal.push(command)
+        else:
+            self.dropped += 1
+
+    def _pop_newest(self):
+        if not self._count:
+            if self.journal is None or not len(self.journal):
+                return None
+            command = self.journal.pop()
+            command.history = self
+            return command
+
+        index = (self._head + self._count - 1) % self.max_entries
+        command = self._ring[index]
+        self._ring[index] = None
+        self._nbytes -= self._sizes[index]
+        self._count -= 1
+        return command
+
+    def undo(self):
+        """Undo the newest command and return it - None if there is nothing to undo"""
+        with self._lock:
+            command = self._pop_newest()
+            if command is not None:
+                command.undo()
+                self._redo.append(command)
+            return command
+
+    def redo(self):
+        """Execute the most recently undone command again - None if there is nothing to redo"""
+        with self._lock:
+            if not self._redo:
+                return None
+
+            command = self._redo.pop()
+            self._redoing = True
+            try:
+                command.execute()
+            finally:
+                self._redoing = False
+            return command
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        """Number of commands that can be undone (including spilled ones)"""
+        return self._count + (len(self.journal) if self.journal is not None else 0)
+
+    def __iter__(self):
+        """Iterate over commands kept in memory, oldest first"""
+        for i in range(self._count):
+            yield self._ring[(self._head + i) % self.max_entries]
+
+    def __reversed__(self):
+        for i in reversed(range(self._count)):
+            yield self._ring[(self._head + i) % self.max_entries]
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
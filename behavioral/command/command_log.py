@@ -0,0 +1,209 @@
+from collections import namedtuple
+import os
+import struct
+import sys
+import tempfile
+import time
+
+from command import TouchCommand, RmCommand, backup_name
+
+# record: type, command kind, flags, sequence number, payload length + payload (utf-8 filename)
+_HEADER = struct.Struct('<BBBxIH')
+
+BEGIN, COMMIT, ABORT = 1, 2, 3
+TOUCH, RM = 1, 2
+EXISTED = 1
+
+_KINDS = {TouchCommand: TOUCH, RmCommand: RM}
+# whether the file exists after a command of the kind ran
+_EXISTS_AFTER = {TOUCH: True, RM: False}
+
+Incomplete = namedtuple('Incomplete', 'seq,kind,flags,filename')
+
+
+class CommandLog:
+    """Write-ahead log of file-system commands
+
+    Every command is logged as BEGIN (before it runs) and COMMIT (after it ran).
+    BEGIN records are fsynced before the command touches the file system and the
+    COMMIT records of a group before execute_many() returns, so a command reported
+    as done is never undone by recovery. With sync_every set, COMMIT records are
+    fsynced only every sync_every records instead - a crash may then roll back (or
+    replay) commands the caller was told had completed.
+    """
+
+    def __init__(self, path, sync_every=None, recovery='rollback'):
+        self.path = path
+        self.sync_every = sync_every
+        self.syncs = 0
+        self.recovered = recover(path, recovery)
+        self._seq = 0
+        if os.path.exists(path):
+            # continue the sequence of a kept log, so new COMMITs cannot match its incomplete BEGINs
+            with open(path, 'r+b') as f:
+                _, size, self._seq = _scan(f.read())
+                f.truncate(size)
+        self._file = open(path, 'ab')
+        self._unsynced = 0
+
+    def _write(self, record_type, kind, flags, seq, payload=b''):
+        self._file.write(_HEADER.pack(record_type, kind, flags, seq, len(payload)) + payload)
+        self._unsynced += 1
+
+    def sync(self):
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self.syncs += 1
+
+    def begin(self, command, exists=None):
+        """Log BEGIN for a command and return its sequence number
+
+        exists maps paths to whether they exist once the commands logged before
+        this one in the same group have run - it is updated for this command.
+        """
+        self._seq += 1
+        kind = _KINDS[type(command)]
+        path = os.path.abspath(command.filename)
+
+        existed = exists[path] if exists is not None and path in exists else os.path.exists(path)
+        if exists is not None:
+            exists[path] = _EXISTS_AFTER[kind]
+
+        self._write(BEGIN, kind, EXISTED if existed else 0, self._seq, os.fsencode(path))
+        return self._seq
+
+    def commit(self, seq):
+        self._write(COMMIT, 0, 0, seq)
+        if self.sync_every is not None and self._unsynced >= self.sync_every:
+            self.sync()
+
+    def execute(self, command):
+        return self.execute_many([command])[0]
+
+    def execute_many(self, commands):
+        """Group commit: one fsync for the BEGIN and one for the COMMIT records of the whole group"""
+        commands = list(commands)
+        exists = {}
+        seqs = [self.begin(command, exists) for command in commands]
+        self.sync()
+
+        results = []
+        for i, (seq, command) in enumerate(zip(seqs, commands)):
+            try:
+                results.append(command.execute())
+            except Exception:
+                # the failed command and the ones after it did not change anything
+                for unexecuted in seqs[i:]:
+                    self._write(ABORT, 0, 0, unexecuted)
+                self.sync()
+                raise
+            self.commit(seq)
+
+        if self.sync_every is None:
+            self.sync()
+        return results
+
+    def checkpoint(self):
+        """Drop all records - call when no command is in flight"""
+        self.sync()
+        self._file.truncate(0)
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+
+def scan(path):
+    """Return incomplete commands (BEGIN without COMMIT) in log order and the length of the valid log"""
+    with open(path, 'rb') as f:
+        return _scan(f.read())[:2]
+
+
+def _scan(data):
+    """Return incomplete commands, the length of the valid log and the sequence number of its newest BEGIN"""
+    unpack_from, header_size = _HEADER.unpack_from, _HEADER.size
+    pending = {}
+    offset, end = 0, len(data)
+    last_seq = 0
+
+    while offset + header_size <= end:
+        record_type, kind, flags, seq, size = unpack_from(data, offset)
+        if offset + header_size + size > end:
+            break
+        if record_type == BEGIN:
+            pending[seq] = offset
+            last_seq = seq
+        else:
+            pending.pop(seq, None)
+        offset += header_size + size
+
+    incomplete = []
+    for seq, start in pending.items():
+        _, kind, flags, _, size = unpack_from(data, start)
+        filename = os.fsdecode(data[start + header_size:start + header_size + size])
+        incomplete.append(Incomplete(seq, kind, flags, filename))
+
+    return incomplete, offset, last_seq
+
+
+def recover(path, mode='rollback'):
+    """Bring the file system to a consistent state after a crash and reset the log
+
+    mode='rollback' undoes incomplete commands, mode='replay' completes them.
+    Both are idempotent, so recovery itself may crash and be restarted.
+    mode=None skips recovery and keeps the log.
+    """
+    if mode is None or not os.path.exists(path):
+        return []
+
+    incomplete, _ = scan(path)
+    ordered = reversed(incomplete) if mode == 'rollback' else incomplete
+
+    for command in ordered:
+        backup = backup_name(command.filename)
+        exists = os.path.exists(command.filename)
+
+        if command.kind == TOUCH:
+            if mode == 'rollback' and not command.flags & EXISTED and exists:
+                os.remove(command.filename)
+            elif mode == 'replay':
+                with open(command.filename, 'a'):
+                    os.utime(command.filename, None)
+
+        elif command.kind == RM:
+            if mode == 'rollback' and command.flags & EXISTED and not exists and os.path.exists(backup):
+                os.rename(backup, command.filename)
+            elif mode == 'replay' and exists:
+                os.rename(command.filename, backup)
+
+    with open(path, 'r+b') as f:
+        f.truncate(0)
+        f.flush()
+        os.fsync(f.fileno())
+
+    return incomplete
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'commands.log')
+
+        log = CommandLog(path, recovery=None)
+        for i in range(count // 2):
+            command = TouchCommand(None, os.path.join(tmp, f'file{i}.txt'))
+            log.commit(log.begin(command))
+        log.begin(RmCommand(None, os.path.join(tmp, 'file0.txt')))
+        log.close()
+
+        start = time.perf_counter()
+        incomplete, size = scan(path)
+        elapsed = time.perf_counter() - start
+
+        print(f'scanned {count} records ({size / 2**20:.1f} MB) in {elapsed:.3f}s '
+              f'- {count / elapsed:,.0f} records/s, incomplete: {incomplete}')
+
+
+if __name__ == '__main__':
+    main(int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**6)
@@ -0,0 +1,219 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import threading
+import time
+
+from command import UndoableCommand
+
+QueueStats = namedtuple('QueueStats', 'executed,failed,elapsed,throughput')
+
+
+class DependencyFailed(Exception):
+    """Command was skipped because an earlier command on the same path failed"""
+
+
+class BatchFailed(Exception):
+    def __init__(self, errors, rolled_back):
+        super().__init__(f'{len(errors)} command(s) failed' + (' - batch rolled back' if rolled_back else ''))
+        self.errors = errors
+        self.rolled_back = rolled_back
+
+
+def _segments(commands):
+    """Split (index, command) pairs at barriers - commands whose paths() is None"""
+    segment = []
+    for item in commands:
+        if item[1].paths() is None:
+            if segment:
+                yield segment
+            yield [item]
+            segment = []
+        else:
+            segment.append(item)
+    if segment:
+        yield segment
+
+
+def _chains(segment):
+    """Group commands sharing a path into chains kept in submission order"""
+    parent = {}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for index, command in segment:
+        paths = command.paths()
+        if not paths:
+            continue
+        roots = {find(p) if p in parent else parent.setdefault(p, p) for p in paths}
+        root = min(roots)
+        for other in roots:
+            parent[other] = root
+
+    chains = {}
+    for item in segment:
+        paths = item[1].paths()
+        key = find(paths[0]) if paths else ('command', item[0])
+        chains.setdefault(key, []).append(item)
+
+    return list(chains.values())
+
+
+class _BatchHistory:
+    """Stands in for a history while a transactional batch runs
+
+    Commands append their clones here; they reach the real history only once the
+    whole batch has succeeded, so a rolled back batch leaves nothing to undo.
+    """
+
+    def __init__(self, history):
+        self.history = history
+        self.entries = []
+
+    def append(self, command):
+        self.entries.append(command)
+
+    def merge(self):
+        for command in self.entries:
+            command.history = self.history
+            self.history.append(command)
+
+
+class CommandQueue:
+    """Collects commands and executes them on a thread pool
+
+    Commands touching the same path (Command.paths()) run in submission order on one
+    thread; independent chains run concurrently. Chains are packed into one task per
+    worker so scheduling costs O(workers), not O(commands). A command whose paths()
+    is None is a barrier: it runs alone after everything queued before it.
+    """
+
+    def __init__(self, workers=8):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._commands = []
+        self._lock = threading.Lock()
+        self._executed = 0
+        self._failed = 0
+        self._elapsed = 0.0
+
+    def put(self, command):
+        self._commands.append(command)
+
+    def extend(self, commands):
+        self._commands.extend(commands)
+
+    def __len__(self):
+        return len(self._commands)
+
+    def run(self, transactional=False):
+        """Execute queued commands and return their results in submission order
+
+        When a command fails, the rest of its chain is skipped and BatchFailed is raised
+        after the other chains finish. With transactional=True every executed undoable
+        command is undone first, so the batch is all or nothing, and commands are
+        added to their histories only if the whole batch succeeds.
+        """
+        commands, self._commands = self._commands, []
+        batch_histories = self._swap_histories(commands) if transactional else {}
+        try:
+            return self._run(commands, transactional, batch_histories)
+        finally:
+            for command in commands:
+                if isinstance(command, UndoableCommand) and isinstance(command.history, _BatchHistory):
+                    command.history = command.history.history
+
+    def _run(self, commands, transactional, batch_histories):
+        results = [None] * len(commands)
+        errors = []
+        executed_segments = []
+
+        start = time.perf_counter()
+        for segment in _segments(enumerate(commands)):
+            buckets = self._pack(_chains(segment))
+            executed = [[] for _ in buckets]
+            futures = [self._executor.submit(self._run_bucket, bucket, results, errors, done)
+                       for bucket, done in zip(buckets, executed)]
+            for future in futures:
+                future.result()
+            executed_segments.append(executed)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._executed += len(commands) - len(errors)
+            self._failed += len(errors)
+            self._elapsed += elapsed
+
+        if not errors:
+            for batch_history in batch_histories.values():
+                batch_history.merge()
+            return results
+
+        if transactional:
+            for executed in reversed(executed_segments):
+                for done in executed:
+                    for command in reversed(done):
+                        if isinstance(command, UndoableCommand):
+                            command.undo()
+
+        raise BatchFailed(sorted(errors, key=lambda error: error[0]), transactional)
+
+    def run_batch(self, commands):
+        """Execute commands all or nothing"""
+        self.extend(commands)
+        return self.run(transactional=True)
+
+    @staticmethod
+    def _swap_histories(commands):
+        batch_histories = {}
+        for command in commands:
+            if isinstance(command, UndoableCommand):
+                history = command.history
+                if id(history) not in batch_histories:
+                    batch_histories[id(history)] = _BatchHistory(history)
+                command.history = batch_histories[id(history)]
+        return batch_histories
+
+    def _pack(self, chains):
+        """Distribute chains over at most `workers` buckets, longest chains first"""
+        count = min(self.workers, len(chains))
+        buckets = [[] for _ in range(count)]
+        loads = [(0, i) for i in range(count)]
+
+        for chain in sorted(chains, key=len, reverse=True):
+            load, i = heapq.heappop(loads)
+            buckets[i].append(chain)
+            heapq.heappush(loads, (load + len(chain), i))
+
+        return buckets
+
+    @staticmethod
+    def _run_bucket(bucket, results, errors, done):
+        for chain in bucket:
+            failure = None
+            for index, command in chain:
+                if failure is not None:
+                    error = DependencyFailed(command)
+                    error.__cause__ = failure
+                    errors.append((index, command, error))
+                    continue
+                try:
+                    results[index] = command.execute()
+                except Exception as error:
+                    failure = error
+                    errors.append((index, command, error))
+                else:
+                    done.append(command)
+
+    def stats(self):
+        with self._lock:
+            done = self._executed + self._failed
+            return QueueStats(self._executed, self._failed, self._elapsed,
+                              done / self._elapsed if self._elapsed else 0.0)
+
+    def shutdown(self):
+        self._executor.shutdown()
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+import time
+
+from command import LsCommand, TouchCommand, RmCommand
+from command_history import CommandHistory
+from command_queue import CommandQueue
+
+
+def ls_listdir(path):
+    """LsCommand.execute before os.scandir - one stat per entry"""
+    return [filename for filename in os.listdir(path) if os.path.isfile(os.path.join(path, filename))]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(count, workers=8):
+    with tempfile.TemporaryDirectory() as tmp:
+        names = [os.path.join(tmp, f'file{i}.txt') for i in range(count)]
+        history = CommandHistory(max_entries=2 * count)
+
+        def serial():
+            for name in names:
+                TouchCommand(history, name).execute()
+
+        def queued(command_type):
+            queue = CommandQueue(workers)
+            queue.extend(command_type(history, name) for name in names)
+            queue.run()
+            queue.shutdown()
+            return queue.stats()
+
+        elapsed, _ = timed(serial)
+        print(f'touch serial:      {count / elapsed:>10.0f} cmd/s')
+
+        elapsed, _ = timed(lambda: [RmCommand(history, name).execute() for name in names])
+        print(f'rm serial:         {count / elapsed:>10.0f} cmd/s')
+        for name in names:
+            os.remove(os.path.join(tmp, '~' + os.path.basename(name)))
+
+        stats = queued(TouchCommand)
+        print(f'touch CommandQueue:{stats.throughput:>10.0f} cmd/s ({workers} workers)')
+
+        elapsed, listed = timed(lambda: ls_listdir(tmp))
+        print(f'ls listdir+isfile: {elapsed * 1e3:>10.1f} ms')
+        elapsed, scanned = timed(lambda: LsCommand(tmp, output=lambda text: None).execute())
+        print(f'ls scandir:        {elapsed * 1e3:>10.1f} ms')
+        assert sorted(listed) == sorted(scanned)
+
+        stats = queued(RmCommand)
+        print(f'rm CommandQueue:   {stats.throughput:>10.0f} cmd/s ({workers} workers)')
+
+
+if __name__ == '__main__':
+    main(int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**5)
@@ -0,0 +1,86 @@
+from command import UndoableCommand, TouchCommand, RmCommand
+from command_history import CommandHistory
+
+
+class AppendCommand(UndoableCommand):
+    log = []
+
+    def __init__(self, history, value):
+        super().__init__(history)
+        self.value = value
+
+    def execute(self):
+        self.history.append(self.clone())
+        self.log.append(self.value)
+
+    def undo(self):
+        assert self.log.pop() == self.value
+
+
+def run(history, values):
+    AppendCommand.log = []
+    for value in values:
+        AppendCommand(history, value).execute()
+
+
+def test_ring_buffer_forgets_oldest_without_journal():
+    history = CommandHistory(max_entries=3)
+    run(history, range(5))
+
+    assert len(history) == 3
+    assert [c.value for c in history] == [2, 3, 4]
+    assert history.dropped == 2
+
+
+def test_byte_budget_limits_entries():
+    history = CommandHistory(max_entries=100, max_bytes=30, sizeof=lambda command: 10)
+    run(history, range(10))
+
+    assert [c.value for c in history] == [7, 8, 9]
+    assert history.nbytes == 30
+
+
+def test_spilled_commands_are_paged_back_for_undo(tmp_path):
+    history = CommandHistory(max_entries=4, journal_path=tmp_path / 'history.journal')
+    run(history, range(50))
+
+    assert len(history) == 50
+    assert len(history.journal) == 46
+
+    while history.undo():
+        pass
+
+    assert AppendCommand.log == []
+    assert len(history) == 0
+    history.close()
+
+
+def test_redo_after_undo_and_new_command_clears_redo():
+    history = CommandHistory()
+    run(history, ['a', 'b'])
+
+    history.undo()
+    assert AppendCommand.log == ['a']
+    history.redo()
+    assert AppendCommand.log == ['a', 'b']
+
+    history.undo()
+    AppendCommand(history, 'c').execute()
+    assert history.redo() is None
+    assert AppendCommand.log == ['a', 'c']
+
+
+def test_file_commands_undo_and_redo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history = CommandHistory()
+
+    TouchCommand(history, 'file.txt').execute()
+    RmCommand(history, 'file.txt').execute()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['~file.txt']
+
+    history.undo()
+    history.undo()
+    assert list(tmp_path.iterdir()) == []
+
+    history.redo()
+    assert [p.name for p in tmp_path.iterdir()] == ['file.txt']
@@ -0,0 +1,133 @@
+import pytest
+
+from command import TouchCommand, RmCommand
+from command_history import CommandHistory
+from command_log import CommandLog, EXISTED, scan
+
+
+@pytest.fixture
+def history():
+    return CommandHistory()
+
+
+def crash_during(log, command, apply):
+    """Log BEGIN, perform the side effect and 'crash' before COMMIT"""
+    log.begin(command)
+    log.sync()
+    apply()
+    log._file.close()
+
+
+def test_committed_commands_are_not_touched(tmp_path, history):
+    log = CommandLog(tmp_path / 'commands.log')
+    log.execute_many([TouchCommand(history, str(tmp_path / 'a.txt')),
+                      RmCommand(history, str(tmp_path / 'a.txt'))])
+    log.close()
+
+    assert scan(tmp_path / 'commands.log')[0] == []
+    assert CommandLog(tmp_path / 'commands.log').recovered == []
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['commands.log', '~a.txt']
+
+
+def test_incomplete_rm_is_rolled_back(tmp_path, history):
+    target = tmp_path / 'a.txt'
+    target.touch()
+    log = CommandLog(tmp_path / 'commands.log')
+    command = RmCommand(history, str(target))
+
+    crash_during(log, command, command.execute)
+
+    recovered = CommandLog(tmp_path / 'commands.log').recovered
+    assert [c.filename for c in recovered] == [str(target)]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['a.txt', 'commands.log']
+
+
+def test_incomplete_rm_is_replayed(tmp_path, history):
+    target = tmp_path / 'a.txt'
+    target.touch()
+    log = CommandLog(tmp_path / 'commands.log')
+
+    crash_during(log, RmCommand(history, str(target)), lambda: None)
+
+    CommandLog(tmp_path / 'commands.log', recovery='replay')
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['commands.log', '~a.txt']
+
+
+def test_incomplete_touch_of_new_file_is_rolled_back(tmp_path, history):
+    log = CommandLog(tmp_path / 'commands.log')
+    command = TouchCommand(history, str(tmp_path / 'new.txt'))
+
+    crash_during(log, command, command.execute)
+
+    CommandLog(tmp_path / 'commands.log')
+    assert [p.name for p in tmp_path.iterdir()] == ['commands.log']
+
+
+def test_crash_inside_group_on_one_path_is_rolled_back(tmp_path, history):
+    log = CommandLog(tmp_path / 'commands.log')
+    log.commit = lambda seq: None
+
+    log.execute_many([TouchCommand(history, str(tmp_path / 'a.txt')),
+                      RmCommand(history, str(tmp_path / 'a.txt'))])
+    log._file.close()
+
+    recovered = CommandLog(tmp_path / 'commands.log').recovered
+    assert [c.flags for c in recovered] == [0, EXISTED]
+    assert [p.name for p in tmp_path.iterdir()] == ['commands.log']
+
+
+def test_failed_command_is_aborted_and_torn_tail_ignored(tmp_path, history):
+    log = CommandLog(tmp_path / 'commands.log')
+    (tmp_path / '~missing.txt').touch()
+
+    with pytest.raises(FileNotFoundError):
+        log.execute_many([RmCommand(history, str(tmp_path / 'missing.txt')),
+                          TouchCommand(history, str(tmp_path / 'never.txt'))])
+    log.close()
+    with open(tmp_path / 'commands.log', 'ab') as f:
+        f.write(b'\x01\x01')
+
+    assert scan(tmp_path / 'commands.log')[0] == []
+    assert CommandLog(tmp_path / 'commands.log').recovered == []
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['commands.log', '~missing.txt']
+
+
+def test_group_commit_batches_fsyncs(tmp_path, history):
+    log = CommandLog(tmp_path / 'commands.log', sync_every=100)
+    log.execute_many(TouchCommand(history, str(tmp_path / f'{i}.txt')) for i in range(50))
+    log.close()
+
+    assert log.syncs == 2
+
+
+def test_commits_are_durable_when_execute_many_returns(tmp_path, history):
+    log = CommandLog(tmp_path / 'commands.log')
+    log.execute_many([TouchCommand(history, str(tmp_path / 'a.txt')),
+                      TouchCommand(history, str(tmp_path / 'b.txt'))])
+
+    assert log.syncs == 2
+    assert scan(tmp_path / 'commands.log')[0] == []
+
+
+def test_recovery_does_not_depend_on_the_working_directory(tmp_path, history, monkeypatch):
+    (tmp_path / 'a.txt').touch()
+    monkeypatch.chdir(tmp_path)
+    log = CommandLog(tmp_path / 'commands.log')
+    command = RmCommand(history, 'a.txt')
+    crash_during(log, command, command.execute)
+
+    monkeypatch.chdir(tmp_path.parent)
+    recovered = CommandLog(tmp_path / 'commands.log').recovered
+    assert [c.filename for c in recovered] == [str(tmp_path / 'a.txt')]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['a.txt', 'commands.log']
+
+
+def test_kept_log_continues_the_sequence(tmp_path, history):
+    log = CommandLog(tmp_path / 'commands.log')
+    crash_during(log, TouchCommand(history, str(tmp_path / 'a.txt')), lambda: None)
+
+    log = CommandLog(tmp_path / 'commands.log', recovery=None)
+    log.execute(TouchCommand(history, str(tmp_path / 'b.txt')))
+    log.close()
+
+    assert [c.filename for c in scan(tmp_path / 'commands.log')[0]] == [str(tmp_path / 'a.txt')]
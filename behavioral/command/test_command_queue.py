@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from command import LsCommand, TouchCommand, RmCommand
+from command_history import CommandHistory
+from command_queue import CommandQueue, BatchFailed, DependencyFailed, _chains
+
+
+@pytest.fixture
+def queue():
+    queue = CommandQueue(workers=4)
+    yield queue
+    queue.shutdown()
+
+
+def test_commands_on_same_path_keep_order(tmp_path, queue):
+    history = CommandHistory()
+    names = [str(tmp_path / f'file{i}.txt') for i in range(50)]
+    for name in names:
+        queue.put(TouchCommand(history, name))
+        queue.put(RmCommand(history, name))
+    queue.put(LsCommand(str(tmp_path), output=lambda text: None))
+
+    results = queue.run()
+
+    assert sorted(results[-1]) == sorted('~' + os.path.basename(name) for name in names)
+    assert queue.stats().executed == 101
+
+
+def test_failed_batch_is_rolled_back(tmp_path, queue):
+    history = CommandHistory()
+    commands = [TouchCommand(history, str(tmp_path / 'a.txt')),
+                TouchCommand(history, str(tmp_path / 'b.txt')),
+                RmCommand(history, str(tmp_path / 'missing.txt')),
+                RmCommand(history, str(tmp_path / 'missing.txt'))]
+
+    with pytest.raises(BatchFailed) as failure:
+        queue.run_batch(commands)
+
+    assert list(tmp_path.iterdir()) == []
+    assert failure.value.rolled_back
+    assert isinstance(failure.value.errors[0][2], FileNotFoundError)
+    assert isinstance(failure.value.errors[1][2], DependencyFailed)
+    assert queue.stats().failed == 2
+
+
+def test_rolled_back_batch_leaves_history_untouched(tmp_path, queue):
+    history = CommandHistory()
+    TouchCommand(history, str(tmp_path / 'kept.txt')).execute()
+    commands = [TouchCommand(history, str(tmp_path / 'a.txt')),
+                RmCommand(history, str(tmp_path / 'missing.txt'))]
+
+    with pytest.raises(BatchFailed):
+        queue.run_batch(commands)
+
+    assert len(history) == 1
+    assert all(command.history is history for command in commands)
+    history.undo()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_successful_batch_is_added_to_history(tmp_path, queue):
+    history = CommandHistory()
+    queue.run_batch([TouchCommand(history, str(tmp_path / 'a.txt')),
+                     TouchCommand(history, str(tmp_path / 'b.txt'))])
+
+    assert len(history) == 2
+    assert all(command.history is history for command in history)
+    while history.undo():
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_rollback_keeps_files_that_existed_before(tmp_path, queue):
+    existing = tmp_path / 'existing.txt'
+    existing.write_text('data')
+    os.utime(existing, ns=(10**18, 10**18))
+    history = CommandHistory()
+
+    with pytest.raises(BatchFailed):
+        queue.run_batch([TouchCommand(history, str(existing)),
+                         RmCommand(history, str(tmp_path / 'missing.txt'))])
+
+    assert existing.read_text() == 'data'
+    assert existing.stat().st_mtime_ns == 10**18
+
+
+def test_rm_conflicts_with_commands_on_its_backup(tmp_path):
+    history = CommandHistory()
+    name = str(tmp_path / 'a.txt')
+    rm, touch_backup = RmCommand(history, name), TouchCommand(history, str(tmp_path / '~a.txt'))
+
+    assert len(_chains([(0, rm), (1, touch_backup)])) == 1
+
+
+def test_ls_lists_only_files(tmp_path):
+    (tmp_path / 'dir').mkdir()
+    (tmp_path / 'file.txt').touch()
+
+    assert LsCommand(str(tmp_path), output=lambda text: None).execute() == ['file.txt']
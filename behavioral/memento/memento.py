@@ -1,53 +1,341 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from copy import copy, deepcopy
+import functools
+import inspect
+from itertools import count
+import threading
+from types import MethodType
+import weakref
+
+from snapshot import (Snapshottable, UndoLog, attach_log, detach_log, restore as restore_snapshot, set_log,
+                      take as take_snapshot)
 
 
 def memento(obj, deep=False):
+    if isinstance(obj, Snapshottable):
+        snapshot = take_snapshot(obj, deep)
+        return lambda: restore_snapshot(obj, snapshot)
+
     state = deepcopy(obj.__dict__) if deep else copy(obj.__dict__)
 
     def restore():
         obj.__dict__.clear()
-        obj.__dict__.update(state)
+        # a memento may be restored again, so it must not share values with the object
+        obj.__dict__.update(deepcopy(state) if deep else state)
 
     return restore
 
 
 class Transaction:
-    """Transaction guard"""
+    """Transaction guard with nested transactions and savepoints
 
-    deep = False
-    states = []
+    Unless deep is set, writes to Snapshottable targets are kept in an undo log, so
+    rolling back costs O(writes since the savepoint). Other targets - all of them
+    with deep=True, as the undo log does not see changes nested in attribute
+    values - are restored from mementos taken at commit() and at every savepoint.
+    The undo log is detached from the targets by close(), or once the transaction
+    is garbage collected. Transactions on disjoint objects share no state and can
+    run in separate threads.
+    """
 
     def __init__(self, deep, *targets):
         self.deep = deep
         self.targets = targets
+        self.log = UndoLog()
+        self.states = []
+        self._savepoints = {}  # name -> (undo log position, mementos of other targets)
+        self._nested = count()
+        self._lock = threading.RLock()
+
+        logged = [] if deep else [target for target in targets if isinstance(target, Snapshottable)]
+        self._others = targets if deep else [target for target in targets if not isinstance(target, Snapshottable)]
+        for target in logged:
+            attach_log(target, self.log)
+        self._detach = weakref.finalize(self, _detach_logs, logged, self.log)
         self.commit()
 
+    def _mementos(self):
+        return [memento(target, self.deep) for target in self._others]
+
     def commit(self):
-        self.states = [memento(target, self.deep) for target in self.targets]
+        with self._lock:
+            self.log.clear()
+            self._savepoints.clear()
+            self.states = self._mementos()
+
+    def savepoint(self, name):
+        """Mark the current state - an existing savepoint with the same name is replaced"""
+        with self._lock:
+            if name in self._savepoints:
+                self.release(name)
+            self._savepoints[name] = (self.log.mark(), self._mementos())
+            return name
+
+    def release(self, name):
+        """Forget the savepoint and the ones set after it, keeping their changes"""
+        with self._lock:
+            position, _ = self._savepoints[name]
+            names = list(self._savepoints)
+            for later in names[names.index(name):]:
+                del self._savepoints[later]
+            self.log.release(position)
+
+    def rollback(self, savepoint=None):
+        """Undo the changes since the savepoint, or since the last commit"""
+        with self._lock:
+            if savepoint is None:
+                self.log.rollback()
+                self._savepoints.clear()
+                states = self.states
+            else:
+                position, states = self._savepoints[savepoint]
+                names = list(self._savepoints)
+                for later in names[names.index(savepoint) + 1:]:
+                    del self._savepoints[later]
+                self.log.rollback(position)
+
+            for state in states:
+                state()
+
+    @contextmanager
+    def nested(self):
+        """Nested transaction: rolled back to its start if the block raises"""
+        name = self.savepoint(('nested', next(self._nested)))
+        try:
+            yield self
+        except BaseException:
+            self.rollback(name)
+            raise
+        finally:
+            self.release(name)
+
+    def close(self):
+        self._detach()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
 
-    def rollback(self):
-        for state in self.states:
-            state()
+
+def _detach_logs(targets, log):
+    for target in targets:
+        if target._snapshot_log is log:
+            detach_log(target)
 
 
 class Transactional:
     """Adds transactional semantics to methods. Methods decorated with @Transactional will rollback to entry-state
-       upon exception"""
+       upon exception
+
+    The wrapper is built once per method and bound like a plain method, so nothing
+    is stored on the instance. async def methods get an async wrapper. With
+    @Transactional(lazy=True) nothing is copied upfront: writes to the
+    (Snapshottable) instance go to an undo log, which joins the log of a
+    Transaction the instance already takes part in.
+    """
 
-    def __init__(self, method):
+    def __init__(self, method=None, *, lazy=False):
         self.method = method
+        self.lazy = lazy
+        self.name = getattr(method, '__name__', None)
+        self.wrapper = None if method is None else self._wrap(method, lazy)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        if self.method is None:
+            self.__init__(*args, lazy=self.lazy)
+            return self
+        return self.wrapper(*args, **kwargs)
 
     def __get__(self, obj, T):
+        if obj is None:
+            return self
+        return MethodType(self.wrapper, obj)
 
-        def transaction(*args, **kwargs):
+    @staticmethod
+    def _wrap(method, lazy):
+        wrap = _lazy_transaction if lazy else _transaction
+        if inspect.iscoroutinefunction(method):
+            wrap = _lazy_async_transaction if lazy else _async_transaction
+        return functools.wraps(method)(wrap(method))
+
+
+def _lazy_log(obj):
+    try:
+        return obj._snapshot_log
+    except AttributeError:
+        raise TypeError(f'lazy transactions need a Snapshottable object, not {type(obj).__name__}') from None
+
+
+def _transaction(method):
+    def transaction(obj, *args, **kwargs):
+        if isinstance(obj, Snapshottable):
             state = memento(obj)
             try:
-                return self.method(obj, *args, **kwargs)
-            except Exception as e:
+                return method(obj, *args, **kwargs)
+            except Exception:
                 state()
-                raise e
+                raise
+
+        obj_dict = obj.__dict__
+        state = obj_dict.copy()
+        try:
+            return method(obj, *args, **kwargs)
+        except Exception:
+            obj_dict.clear()
+            obj_dict.update(state)
+            raise
+
+    return transaction
+
+
+def _async_transaction(method):
+    async def transaction(obj, *args, **kwargs):
+        state = memento(obj)
+        try:
+            return await method(obj, *args, **kwargs)
+        except Exception:
+            state()
+            raise
+
+    return transaction
+
+
+class _TaskLogs:
+    """Stands in for the undo log of an object with overlapping lazy async calls
+
+    Every lazy call made while it is attached records its writes in its own
+    UndoLog, found through a context variable, so a failing call rolls back only
+    the writes made by its task. A nested call hands its log to the enclosing one
+    when it succeeds. Writes made outside of these calls are not logged. The
+    object is detached when the last call finishes.
+    """
+
+    def __init__(self):
+        self.current = ContextVar('current', default=None)
+        self.calls = 0
+
+    @property
+    def entries(self):
+        log = self.current.get()
+        return [] if log is None else log.entries
+
+    def record(self, obj, name):
+        log = self.current.get()
+        if log is not None:
+            log.record(obj, name)
+
+    def record_container(self, container):
+        log = self.current.get()
+        if log is not None:
+            log.record_container(container)
+
+    def call(self, obj):
+        """Start a call - returns a callback to run with whether it failed"""
+        own_log = UndoLog()
+        token = self.current.set(own_log)
+        self.calls += 1
+
+        def finish(failed):
+            self.current.reset(token)
+            if failed:
+                own_log.rollback()
+            else:
+                enclosing = self.current.get()
+                if enclosing is not None:
+                    enclosing.entries.extend(own_log.entries)
+            self.calls -= 1
+            if not self.calls:
+                detach_log(obj)
+
+        return finish
+
+
+# undo logs of finished lazy transactions, reused to keep the per-call overhead low
+_free_logs = []
+_take_free_log, _give_free_log = _free_logs.pop, _free_logs.append
+
+
+def _lazy_transaction(method):
+    def transaction(obj, *args, **kwargs):
+        try:
+            log = obj._snapshot_log
+        except AttributeError:
+            log = _lazy_log(obj)
+        if log is None:
+            try:
+                log = _take_free_log()
+            except IndexError:
+                log = UndoLog()
+            set_log(obj, log)
+            try:
+                return method(obj, *args, **kwargs)
+            except Exception:
+                log.rollback()
+                raise
+            finally:
+                set_log(obj, None)
+                if log.entries:
+                    log.clear()
+                _give_free_log(log)
+
+        if type(log) is _TaskLogs:
+            finish, failed = log.call(obj), False
+            try:
+                return method(obj, *args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                finish(failed)
+
+        position = log.mark()
+        try:
+            return method(obj, *args, **kwargs)
+        except Exception:
+            log.rollback(position)
+            raise
+        finally:
+            log.release(position)
+
+    return transaction
+
+
+def _lazy_async_transaction(method):
+    async def transaction(obj, *args, **kwargs):
+        log = _lazy_log(obj)
+        if log is None:
+            attach_log(obj, log := _TaskLogs())
+
+        if type(log) is _TaskLogs:
+            finish, failed = log.call(obj), False
+            try:
+                return await method(obj, *args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                finish(failed)
+
+        position = log.mark()
+        try:
+            return await method(obj, *args, **kwargs)
+        except Exception:
+            log.rollback(position)
+            raise
+        finally:
+            log.release(position)
 
-        return transaction
+    return transaction
 
 
 class NumObj:
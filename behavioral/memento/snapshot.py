@@ -0,0 +1,355 @@
+from copy import deepcopy
+
+_MISSING = object()
+_ATOMIC = frozenset({int, float, complex, str, bytes, bool, type(None)})
+_NESTING = _ATOMIC | {tuple, frozenset}
+
+# mutators that cannot add a mutable item, or that add the items they are given
+_SHRINKING = {'__delitem__', '__iand__', '__isub__', 'pop', 'popitem', 'remove', 'discard', 'clear', 'sort',
+              'reverse', 'difference_update', 'intersection_update'}
+_ADDING_ARGS = {'__setitem__', 'append', 'insert', 'add', 'setdefault'}
+
+
+def _is_immutable(value):
+    """True if value cannot change, including everything nested inside it"""
+    if type(value) in _ATOMIC:
+        return True
+    if type(value) in (tuple, frozenset):
+        return _all_immutable(value)
+    return False
+
+
+def _all_immutable(values):
+    types = set(map(type, values))
+    if types <= _ATOMIC:
+        return True
+    return types <= _NESTING and all(map(_is_immutable, values))
+
+
+class _Frozen:
+    """Snapshot of a copy-on-write container
+
+    While data is None the snapshot shares the contents of its owner. The owner
+    copies its contents into data right before it is modified for the first time.
+    """
+
+    __slots__ = ('owner', 'data')
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.data = None
+
+    def thaw(self):
+        """Return a new container with the snapshot contents, sharing them until it is modified"""
+        owner = self.owner
+        container = type(owner)(owner if self.data is None else self.data)
+
+        if owner._shared is self:
+            owner._shared = None
+        self.owner, self.data = container, None
+        container._shared = self
+
+        return container
+
+
+class _Copy:
+    """Deep copy of a value for deep snapshots - every restore gets a fresh copy of it"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = deepcopy(value)
+
+    def thaw(self):
+        return track(deepcopy(self.value))
+
+
+class _Cow:
+    __slots__ = ()
+
+    def _init_cow(self):
+        self._shared = None
+        self._owner = None
+        self._flat = None
+
+    def _is_flat(self):
+        """True if every item is immutable - computed again after the container changes"""
+        if self._flat is None:
+            self._flat = all(map(_all_immutable, self._contents()))
+        return self._flat
+
+    def _detach(self):
+        shared = self._shared
+        if shared is not None:
+            shared.data = self._base(self)
+            self._shared = None
+
+    def _freeze(self):
+        if self._shared is None:
+            self._shared = _Frozen(self)
+        return self._shared
+
+    def __reduce__(self):
+        # snapshot bookkeeping is not pickled - the copy is a fresh container
+        return type(self), (self._base(self),)
+
+
+def _cow_type(base, fill, contents, mutators):
+    def method(name):
+        base_method = getattr(base, name)
+        shrinking, adding_args = name in _SHRINKING, name in _ADDING_ARGS
+
+        def mutator(self, *args, **kwargs):
+            owner = self._owner
+            if owner is not None and owner._snapshot_log is not None:
+                owner._snapshot_log.record_container(self)
+            self._detach()
+            if shrinking:
+                self._flat = self._flat or None
+            elif adding_args:
+                self._flat = self._flat and _all_immutable(args) or None
+            else:
+                self._flat = None
+            return base_method(self, *args, **kwargs)
+
+        mutator.__name__ = name
+        return mutator
+
+    def __init__(self, *args, **kwargs):
+        base.__init__(self, *args, **kwargs)
+        self._init_cow()
+
+    namespace = {'__init__': __init__, '_base': base, '_fill': fill, '_contents': contents,
+                 '__slots__': ('_shared', '_owner', '_flat')}
+    namespace.update((name, method(name)) for name in mutators)
+
+    return type('Cow' + base.__name__.capitalize(), (_Cow, base), namespace)
+
+
+CowList = _cow_type(list, list.extend, lambda items: (items,),
+                     ['__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend', 'insert', 'pop',
+                      'remove', 'clear', 'sort', 'reverse'])
+CowDict = _cow_type(dict, dict.update, lambda items: (items, items.values()),
+                     ['__setitem__', '__delitem__', '__ior__', 'pop', 'popitem', 'clear', 'update', 'setdefault'])
+CowSet = _cow_type(set, set.update, lambda items: (items,),
+                    ['__ior__', '__iand__', '__isub__', '__ixor__', 'add', 'discard', 'remove', 'pop', 'clear',
+                     'update', 'difference_update', 'intersection_update', 'symmetric_difference_update'])
+
+_COW_TYPES = {list: CowList, dict: CowDict, set: CowSet}
+
+
+def track(value):
+    """Wrap plain lists, dicts and sets in their copy-on-write counterparts"""
+    cow_type = _COW_TYPES.get(type(value))
+    return value if cow_type is None else cow_type(value)
+
+
+class Snapshot:
+    """Attributes changed since the parent snapshot - unchanged ones are shared with it"""
+
+    __slots__ = ('parent', 'changes', 'depth')
+
+    max_depth = 32
+
+    def __init__(self, parent, changes):
+        if parent is not None and parent.depth >= self.max_depth:
+            changes = {**parent.state(), **changes}
+            parent = None
+        self.parent = parent
+        self.changes = changes
+        self.depth = 0 if parent is None else parent.depth + 1
+
+    def state(self):
+        state = {}
+        snapshot = self
+        while snapshot is not None:
+            for name, value in snapshot.changes.items():
+                state.setdefault(name, value)
+            snapshot = snapshot.parent
+        return {name: value for name, value in state.items() if value is not _MISSING}
+
+
+class Snapshottable:
+    """Base class for objects snapshotted by recording only what changed
+
+    Attribute writes are tracked and list/dict/set attributes are replaced with
+    copy-on-write containers, so a snapshot costs O(changed attributes) and shares
+    unchanged containers with the previous one. Containers are tracked one level
+    deep - mutable values nested inside them are shared with the snapshot. Other
+    mutable attribute values are shared too. With deep=True every snapshot instead
+    deep-copies each mutable value, except containers holding only immutable items,
+    which stay copy-on-write.
+
+    Assigning a plain list, dict or set - or a container of another Snapshottable -
+    stores a copy-on-write copy of it, which costs O(len) and means the attribute
+    no longer aliases the assigned container. Copying and pickling keep only the
+    attributes: snapshots and undo logs are not carried over.
+    """
+
+    __slots__ = ('_snapshot_dirty', '_snapshot_last', '_snapshot_log', '__dict__', '__weakref__')
+
+    def __new__(cls, *args, **kwargs):
+        self = super().__new__(cls)
+        object.__setattr__(self, '_snapshot_dirty', set())
+        object.__setattr__(self, '_snapshot_last', None)
+        object.__setattr__(self, '_snapshot_log', None)
+        return self
+
+    def _adopt(self, value):
+        value = track(value)
+        if isinstance(value, _Cow):
+            if value._owner is not None and value._owner is not self:
+                value = type(value)(value)
+            value._owner = self
+        return value
+
+    def __setattr__(self, name, value):
+        value = self._adopt(value)
+        log = self._snapshot_log
+        if log is not None:
+            log.entries.append((self, name, self.__dict__.get(name, _MISSING)))
+        object.__setattr__(self, name, value)
+        self._snapshot_dirty.add(name)
+
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, self._adopt(value))
+        self._snapshot_dirty.update(state)
+
+    def __delattr__(self, name):
+        if self._snapshot_log is not None:
+            self._snapshot_log.record(self, name)
+        object.__delattr__(self, name)
+        self._snapshot_dirty.add(name)
+
+
+set_log = Snapshottable._snapshot_log.__set__
+
+
+class UndoLog:
+    """Old values of attributes written, and containers modified, on Snapshottable objects
+
+    A container is copied on its first modification after the newest mark, so
+    rolling back to a mark costs O(writes since the mark) plus the size of the
+    containers modified since then.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.marks = []
+        self._copied = {}  # id(container) -> index of its newest entry
+
+    def record(self, obj, name):
+        self.entries.append((obj, name, obj.__dict__.get(name, _MISSING)))
+
+    def record_container(self, container):
+        index = self._copied.get(id(container))
+        mark = self.marks[-1] if self.marks else 0
+        copied = index is not None and mark <= index < len(self.entries) and self.entries[index][0] is container
+        if not copied:
+            self._copied[id(container)] = len(self.entries)
+            self.entries.append((container, None, container._base(container)))
+
+    def mark(self):
+        position = len(self.entries)
+        self.marks.append(position)
+        return position
+
+    def release(self, position):
+        """Forget the newest mark at position and the ones after it - their writes stay in the log"""
+        for index in reversed(range(len(self.marks))):
+            if self.marks[index] == position:
+                del self.marks[index:]
+                return
+
+    def rollback(self, position=0):
+        """Undo the writes after position, newest first"""
+        entries = self.entries
+        while len(entries) > position:
+            target, name, old = entries.pop()
+            if name is None:
+                target._detach()
+                target._base.clear(target)
+                target._fill(old)
+                target._flat = None
+            else:
+                if old is _MISSING:
+                    target.__dict__.pop(name, None)
+                else:
+                    target.__dict__[name] = old
+                target._snapshot_dirty.add(name)
+        self.marks = [mark for mark in self.marks if mark <= position]
+
+    def clear(self):
+        self.entries.clear()
+        if self.marks:
+            self.marks.clear()
+        if self._copied:
+            self._copied.clear()
+
+
+def attach_log(obj, log):
+    """Record writes to obj and its containers in log"""
+    if obj._snapshot_log is not None and obj._snapshot_log is not log:
+        raise ValueError(f'{obj!r} is already attached to another undo log')
+    set_log(obj, log)
+
+
+def detach_log(obj):
+    set_log(obj, None)
+
+
+def _freeze(value, deep):
+    if isinstance(value, _Cow):
+        if deep and not value._is_flat():
+            return _Copy(value._base(value))
+        return value._freeze()
+    if deep and not _is_immutable(value):
+        return _Copy(value)
+    return value
+
+
+def _changed_in_place(value, deep):
+    """True if value may have changed since the previous snapshot without being assigned"""
+    if isinstance(value, _Cow):
+        return value._shared is None or deep and not value._is_flat()
+    return deep and not _is_immutable(value)
+
+
+def take(obj, deep=False):
+    """Take a Snapshot of a Snapshottable object"""
+    state = obj.__dict__
+    dirty = obj._snapshot_dirty
+    changes = {name: _freeze(state[name], deep) if name in state else _MISSING for name in dirty}
+
+    for name, value in state.items():
+        if name not in changes and _changed_in_place(value, deep):
+            changes[name] = _freeze(value, deep)
+
+    snapshot = Snapshot(obj._snapshot_last, changes)
+    dirty.clear()
+    object.__setattr__(obj, '_snapshot_last', snapshot)
+
+    return snapshot
+
+
+def restore(obj, snapshot):
+    state = {name: value.thaw() if isinstance(value, (_Frozen, _Copy)) else value
+             for name, value in snapshot.state().items()}
+
+    log = obj._snapshot_log
+    if log is not None:
+        for name in obj.__dict__.keys() | state.keys():
+            log.record(obj, name)
+
+    for value in state.values():
+        if isinstance(value, _Cow):
+            value._owner = obj
+
+    obj.__dict__.clear()
+    obj.__dict__.update(state)
+    obj._snapshot_dirty.clear()
+    object.__setattr__(obj, '_snapshot_last', snapshot)
@@ -0,0 +1,52 @@
+import sys
+import time
+import tracemalloc
+
+from memento import memento
+from snapshot import Snapshottable
+
+
+class PlainState:
+
+    def __init__(self, size):
+        self.counter = 0
+        self.items = list(range(size))
+        self.index = {i: str(i) for i in range(size)}
+
+
+class TrackedState(Snapshottable, PlainState):
+    pass
+
+
+def run(state, snapshots, deep):
+    """Take snapshots changing one field (and one container every 10th time) in between"""
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    kept = []
+    for i in range(snapshots):
+        state.counter += 1
+        if i % 10 == 0:
+            state.items[i] = -i
+        kept.append(memento(state, deep))
+
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    kept[0]()
+    assert state.counter == 1 and state.items[0] == 0
+    return elapsed, retained
+
+
+def main(size, snapshots):
+    print(f'{snapshots} snapshots of objects with {size}-element containers')
+    for name, state in [('deepcopy', PlainState(size)), ('copy-on-write', TrackedState(size))]:
+        elapsed, retained = run(state, snapshots, deep=True)
+        print(f'{name:>14}: {elapsed * 1e6 / snapshots:10.1f} us/snapshot, '
+              f'{retained / 2**20:8.1f} MB retained')
+
+
+if __name__ == '__main__':
+    main(int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**5,
+         int(float(sys.argv[2])) if len(sys.argv) > 2 else 20)
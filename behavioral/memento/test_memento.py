@@ -0,0 +1,323 @@
+import asyncio
+import copy
+import pickle
+import threading
+
+import pytest
+
+from memento import NumObj, Transaction, Transactional
+from snapshot import Snapshottable
+
+
+class Account(Snapshottable):
+
+    def __init__(self, balance=0):
+        self.balance = balance
+        self.history = []
+
+
+def test_rollback_to_last_commit():
+    account = Account()
+    transaction = Transaction(False, account)
+    account.balance = 10
+    account.history.append(10)
+    transaction.commit()
+    account.balance = 20
+    account.history.append(20)
+    account.note = 'new'
+
+    transaction.rollback()
+    assert account.__dict__ == {'balance': 10, 'history': [10]}
+
+
+def test_savepoints():
+    account, plain = Account(), NumObj(0)
+    transaction = Transaction(True, account, plain)
+
+    account.balance, plain.value = 1, 1
+    transaction.savepoint('a')
+    account.balance, plain.value = 2, 2
+    account.history.append(2)
+    transaction.savepoint('b')
+    account.balance, plain.value = 3, 3
+    account.history.append(3)
+
+    transaction.rollback('b')
+    assert (account.balance, plain.value, account.history) == (2, 2, [2])
+    transaction.rollback('a')
+    assert (account.balance, plain.value, account.history) == (1, 1, [])
+    with pytest.raises(KeyError):
+        transaction.rollback('b')
+
+    account.balance = 4
+    transaction.rollback('a')
+    assert account.balance == 1
+    transaction.rollback()
+    assert (account.balance, plain.value) == (0, 0)
+
+
+def test_deep_mementos_can_be_restored_repeatedly():
+    plain = NumObj([1])
+    transaction = Transaction(True, plain)
+    transaction.savepoint('a')
+
+    for extra in (2, 3):
+        plain.value.append(extra)
+        transaction.rollback('a')
+        assert plain.value == [1]
+    plain.value.append(4)
+    transaction.rollback()
+    assert plain.value == [1]
+
+
+def test_rollback_cost_depends_on_writes_only():
+    account = Account()
+    account.history.extend(range(10**5))
+    transaction = Transaction(False, account)
+    transaction.savepoint('start')
+    for i in range(3):
+        account.balance = i
+
+    assert len(transaction.log.entries) == 3
+    transaction.rollback('start')
+    assert account.balance == 0
+
+
+def test_released_savepoint_keeps_changes():
+    account = Account()
+    transaction = Transaction(False, account)
+    transaction.savepoint('a')
+    account.balance = 1
+    transaction.release('a')
+    with pytest.raises(KeyError):
+        transaction.rollback('a')
+    assert account.balance == 1
+
+
+def test_nested_transactions():
+    account = Account()
+    transaction = Transaction(False, account)
+
+    with transaction.nested():
+        account.balance = 1
+        with pytest.raises(ValueError):
+            with transaction.nested():
+                account.balance = 2
+                account.history.append(2)
+                raise ValueError
+        assert (account.balance, account.history) == (1, [])
+
+    assert account.balance == 1
+    transaction.rollback()
+    assert account.balance == 0
+
+
+def test_context_manager_and_exclusive_attachment():
+    account = Account()
+    with pytest.raises(RuntimeError):
+        with Transaction(False, account):
+            account.balance = 5
+            with pytest.raises(ValueError):
+                Transaction(False, account)
+            raise RuntimeError
+    assert account.balance == 0
+
+    with Transaction(False, account):
+        account.balance = 6
+    Transaction(False, account)
+    assert account.balance == 6
+
+
+def test_dropped_transaction_detaches_its_log():
+    account = Account()
+    transaction = Transaction(False, account)
+    account.balance = 1
+    transaction.commit()
+    del transaction
+
+    assert account._snapshot_log is None
+    Transaction(False, account).close()
+
+
+def test_deep_transaction_rolls_back_nested_changes():
+    account = Account()
+    account.history.append([1])
+    transaction = Transaction(True, account)
+    assert account._snapshot_log is None
+
+    account.history[0].append(2)
+    account.balance = 3
+    transaction.rollback()
+    assert (account.balance, account.history) == (0, [[1]])
+
+    with Transaction(False, account):
+        account.balance = 4
+    assert account.balance == 4
+
+
+def test_transactions_on_disjoint_objects_in_threads():
+    accounts = [Account() for _ in range(8)]
+
+    def work(account):
+        transaction = Transaction(False, account)
+        for i in range(1000):
+            with transaction.nested():
+                account.balance += 1
+                account.history.append(i)
+            try:
+                with transaction.nested():
+                    account.balance -= 100
+                    account.history.clear()
+                    raise ValueError
+            except ValueError:
+                pass
+        transaction.commit()
+
+    threads = [threading.Thread(target=work, args=(account,)) for account in accounts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for account in accounts:
+        assert account.balance == 1000
+        assert account.history == list(range(1000))
+
+
+class Wallet(Snapshottable):
+
+    def __init__(self):
+        self.balance = 0
+        self.coins = []
+
+    @Transactional
+    def spend(self, amount):
+        self.balance -= amount
+        self.coins.append(-amount)
+        if self.balance < 0:
+            raise ValueError(amount)
+
+    @Transactional(lazy=True)
+    def deposit(self, amount):
+        self.balance += amount
+        self.coins.append(amount)
+        if amount < 0:
+            raise ValueError(amount)
+        return self.balance
+
+    @Transactional(lazy=True)
+    async def deposit_later(self, amount):
+        self.balance += amount
+        await asyncio.sleep(0)
+        if amount < 0:
+            raise ValueError(amount)
+        return self.balance
+
+
+def test_wrapper_is_bound_like_a_method():
+    num_obj = NumObj(0)
+    assert num_obj.do_stuff.__self__ is num_obj
+    assert num_obj.do_stuff.__name__ == 'do_stuff'
+    assert 'do_stuff' not in vars(num_obj)
+
+
+@pytest.mark.parametrize('duplicate', [copy.copy, copy.deepcopy, lambda obj: pickle.loads(pickle.dumps(obj))])
+def test_copies_run_transactions_on_themselves(duplicate):
+    wallet = Wallet()
+    wallet.deposit(5)
+    wallet.spend(1)
+    clone = duplicate(wallet)
+
+    clone.deposit(3)
+    with pytest.raises(ValueError):
+        clone.spend(10)
+    assert (clone.balance, clone.coins) == (7, [5, -1, 3])
+    assert (wallet.balance, wallet.coins) == (4, [5, -1])
+
+
+def test_eager_transaction_rolls_back():
+    num_obj = NumObj(5)
+    with pytest.raises(TypeError):
+        num_obj.do_stuff()
+    assert num_obj.value == 5
+
+    with pytest.raises(TypeError):
+        NumObj.do_stuff(num_obj)
+    assert num_obj.value == 5
+
+
+def test_lazy_transaction_rolls_back_writes():
+    wallet = Wallet()
+    assert wallet.deposit(5) == 5
+    with pytest.raises(ValueError):
+        wallet.deposit(-1)
+    assert (wallet.balance, wallet.coins) == (5, [5])
+    assert wallet._snapshot_log is None
+
+    with pytest.raises(ValueError):
+        wallet.spend(10)
+    assert (wallet.balance, wallet.coins) == (5, [5])
+
+
+def test_lazy_transaction_joins_enclosing_transaction():
+    wallet = Wallet()
+    transaction = Transaction(False, wallet)
+    wallet.deposit(5)
+    with pytest.raises(ValueError):
+        wallet.deposit(-1)
+    assert wallet.balance == 5
+
+    transaction.rollback()
+    assert (wallet.balance, wallet.coins) == (0, [])
+
+
+def test_lazy_needs_snapshottable():
+    class Plain:
+        @Transactional(lazy=True)
+        def method(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Plain().method()
+
+
+def test_async_transactions():
+    wallet = Wallet()
+    assert asyncio.run(wallet.deposit_later(3)) == 3
+    with pytest.raises(ValueError):
+        asyncio.run(wallet.deposit_later(-1))
+    assert wallet.balance == 3
+
+
+def test_overlapping_async_calls_keep_logging_until_the_last_one_finishes():
+    class State(Snapshottable):
+        def __init__(self):
+            self.a = self.b = 0
+
+        @Transactional(lazy=True)
+        async def quick(self):
+            self.a = 1
+
+        @Transactional(lazy=True)
+        def bump(self):
+            self.a += 1
+
+        @Transactional(lazy=True)
+        async def slow(self):
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            self.bump()
+            self.b = 99
+            raise ValueError
+
+    async def run(state):
+        slow = asyncio.create_task(state.slow())
+        await asyncio.sleep(0)
+        await state.quick()
+        with pytest.raises(ValueError):
+            await slow
+
+    state = State()
+    asyncio.run(run(state))
+    assert (state.a, state.b) == (1, 0)
+    assert state._snapshot_log is None
@@ -0,0 +1,181 @@
+import copy
+import pickle
+
+from memento import memento, Transaction
+from snapshot import CowDict, CowList, CowSet, Snapshot, Snapshottable, restore, take
+
+
+class State(Snapshottable):
+
+    def __init__(self):
+        self.value = 0
+        self.items = [1, 2, 3]
+        self.index = {'a': 1}
+        self.tags = {'x'}
+
+
+def test_containers_are_tracked():
+    state = State()
+    assert type(state.items) is CowList
+    assert type(state.index) is CowDict
+    assert state.items == [1, 2, 3]
+
+
+def test_restore_undoes_attribute_and_container_changes():
+    state = State()
+    snapshot = take(state)
+
+    state.value = 5
+    state.items.append(4)
+    state.index['b'] = 2
+    state.tags.discard('x')
+    state.extra = 'new'
+    del state.value
+
+    restore(state, snapshot)
+    assert state.__dict__ == {'value': 0, 'items': [1, 2, 3], 'index': {'a': 1}, 'tags': {'x'}}
+
+
+def test_unchanged_containers_are_shared_between_snapshots():
+    state = State()
+    first = take(state)
+    state.value = 1
+    second = take(state)
+
+    assert second.changes == {'value': 1}
+    assert second.state()['items'] is first.changes['items']
+    assert first.changes['items'].data is None
+
+
+def test_container_is_copied_once_on_first_write():
+    state = State()
+    snapshot = take(state)
+    state.items.append(4)
+    state.items.append(5)
+
+    frozen = snapshot.changes['items']
+    assert frozen.data == [1, 2, 3]
+    assert take(state).changes == {'items': state.items._shared}
+
+
+def test_restoring_older_snapshots_in_any_order():
+    state = State()
+    snapshots = []
+    for i in range(5):
+        state.value = i
+        state.items.append(i)
+        snapshots.append(take(state))
+
+    for i in [2, 4, 0, 3]:
+        restore(state, snapshots[i])
+        assert state.value == i
+        assert state.items == [1, 2, 3] + list(range(i + 1))
+        state.items.clear()
+
+
+def test_long_chains_are_compacted(monkeypatch):
+    monkeypatch.setattr(Snapshot, 'max_depth', 3)
+    state = State()
+    snapshots = []
+    for i in range(10):
+        state.value = i
+        snapshots.append(take(state))
+
+    assert max(snapshot.depth for snapshot in snapshots) == 3
+    restore(state, snapshots[1])
+    assert state.value == 1 and state.items == [1, 2, 3]
+
+
+def test_memento_and_transaction_use_snapshots():
+    state = State()
+    restore_state = memento(state)
+    state.items[0] = 10
+    restore_state()
+    assert state.items == [1, 2, 3]
+
+    transaction = Transaction(True, state)
+    state.value = 'changed'
+    transaction.rollback()
+    assert state.value == 0
+
+
+def test_deep_snapshot_restores_nested_values():
+    state = State()
+    state.items = [[1], [2]]
+    state.options = {'depth': [0]}
+    restore_state = memento(state, deep=True)
+
+    for _ in range(2):
+        state.items[0].append(2)
+        state.options['depth'].append(1)
+        restore_state()
+        assert state.items == [[1], [2]] and state.options == {'depth': [0]}
+        assert type(state.items) is CowList
+
+
+def test_deep_snapshot_sees_nested_changes_made_after_the_previous_one():
+    state = State()
+    state.items = [[1]]
+    take(state, deep=True)
+    state.items[0].append(2)
+    snapshot = take(state, deep=True)
+
+    state.items[0].clear()
+    restore(state, snapshot)
+    assert state.items == [[1, 2]]
+
+
+def test_deep_snapshot_shares_containers_of_immutable_values():
+    state = State()
+    first = take(state, deep=True)
+    state.value = 1
+    second = take(state, deep=True)
+
+    assert second.changes == {'value': 1}
+    assert second.state()['items'] is first.changes['items']
+
+
+def test_deep_snapshot_of_container_that_gained_a_mutable_item():
+    state = State()
+    take(state, deep=True)
+    state.items.append([4])
+    snapshot = take(state, deep=True)
+
+    state.items[-1].append(5)
+    restore(state, snapshot)
+    assert state.items == [1, 2, 3, [4]]
+
+
+def test_copies_and_pickles_own_their_containers():
+    state = State()
+    state.items.append([4])
+    take(state)
+
+    for clone in [copy.copy(state), copy.deepcopy(state), pickle.loads(pickle.dumps(state))]:
+        assert clone.__dict__ == state.__dict__
+        assert type(clone.items) is CowList and clone.items._owner is clone
+        assert clone._snapshot_last is None and clone._snapshot_log is None
+
+        snapshot = take(clone)
+        clone.items.append(5)
+        restore(clone, snapshot)
+        assert clone.items == [1, 2, 3, [4]]
+    assert state.items == [1, 2, 3, [4]]
+
+
+def test_cow_containers_pickle_as_fresh_containers():
+    for container in [CowList([1, 2]), CowDict(a=1), CowSet({1})]:
+        container._freeze()
+        clone = pickle.loads(pickle.dumps(container))
+        assert type(clone) is type(container) and clone == container
+        assert clone._shared is None and clone._owner is None
+
+
+def test_assigning_a_container_stores_a_copy():
+    items = [1, 2]
+    first, second = State(), State()
+    first.items = items
+    second.items = first.items
+
+    assert first.items == items and first.items is not items
+    assert second.items is not first.items and second.items._owner is second
@@ -0,0 +1,65 @@
+import asyncio
+import sys
+import timeit
+
+from memento import Transactional
+from snapshot import Snapshottable
+
+
+class Counter:
+
+    def __init__(self):
+        self.value = 0
+        self.items = list(range(10))
+
+    def bump(self):
+        self.value = 1
+
+    @Transactional
+    def bump_eager(self):
+        self.value = 1
+
+
+class TrackedCounter(Snapshottable, Counter):
+
+    @Transactional(lazy=True)
+    def bump_lazy(self):
+        self.value = 1
+
+    def read(self):
+        return self.value
+
+    @Transactional(lazy=True)
+    def read_lazy(self):
+        return self.value
+
+    @Transactional(lazy=True)
+    async def bump_async(self):
+        self.value = 1
+
+
+def per_call(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e9
+
+
+def main(number):
+    counter, tracked = Counter(), TrackedCounter()
+    cases = [
+        ('eager', counter.bump, counter.bump_eager),
+        ('eager, tracked', tracked.bump, tracked.bump_eager),
+        ('lazy, one write', tracked.bump, tracked.bump_lazy),
+        ('lazy, no writes', tracked.read, tracked.read_lazy),
+    ]
+    for name, plain, transactional in cases:
+        base = per_call(plain, number)
+        print(f'{name:>16}: {per_call(transactional, number) - base:7.0f} ns/call overhead')
+
+    loop = asyncio.new_event_loop()
+    coroutine = tracked.bump_async
+    elapsed = per_call(lambda: loop.run_until_complete(coroutine()), number // 10)
+    print(f'{"async, lazy":>16}: {elapsed:7.0f} ns/call including the event loop')
+    loop.close()
+
+
+if __name__ == '__main__':
+    main(int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**5)
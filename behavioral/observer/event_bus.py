@@ -0,0 +1,211 @@
+from collections import namedtuple
+import multiprocessing
+import threading
+
+from observer import Subject
+from observer_registry import ObserverRegistry, _key
+
+Message = namedtuple('Message', 'topic,payload')
+
+
+class _TopicNode:
+    __slots__ = ('children', 'observers', 'rest')
+
+    def __init__(self):
+        self.children = {}   # segment (or '*') -> _TopicNode
+        self.observers = None  # registry of patterns ending here
+        self.rest = None       # registry of patterns ending here with '#'
+
+
+class EventBus(Subject):
+    """Subject publishing messages only to observers subscribed to a matching topic
+
+    Topics are dot separated. A pattern segment '*' matches exactly one segment
+    and a trailing '#' matches any number of remaining segments. Patterns without
+    wildcards are kept in a dict, the others in a trie walked segment by segment,
+    so publishing touches only matching subscriptions (plus predicate ones).
+    Observers registered with register_observer receive every message.
+    """
+
+    def __init__(self, dispatcher=None):
+        super().__init__(dispatcher)
+        self._exact = {}
+        self._trie = _TopicNode()
+        self._predicates = {}
+
+    def subscribe(self, pattern, observer, weak=True):
+        segments = pattern.split('.')
+        if '*' not in segments and '#' not in segments:
+            self._exact.setdefault(pattern, ObserverRegistry()).add(observer, weak)
+            return
+
+        if '#' in segments[:-1]:
+            raise ValueError(f"'#' is only allowed as the last segment: {pattern}")
+
+        node = self._trie
+        for segment in segments:
+            if segment == '#':
+                if node.rest is None:
+                    node.rest = ObserverRegistry()
+                node.rest.add(observer, weak)
+                return
+            node = node.children.setdefault(segment, _TopicNode())
+
+        if node.observers is None:
+            node.observers = ObserverRegistry()
+        node.observers.add(observer, weak)
+
+    def subscribe_where(self, predicate, observer, weak=True):
+        """Subscribe observer to every message for which predicate(message) is true"""
+        self._predicates.setdefault(predicate, ObserverRegistry()).add(observer, weak)
+
+    def unsubscribe(self, pattern, observer):
+        for registry in self._pattern_registries(pattern):
+            if observer in registry:
+                registry.remove(observer)
+                return
+        raise KeyError(pattern)
+
+    def unsubscribe_where(self, predicate, observer):
+        self._predicates[predicate].remove(observer)
+
+    def _pattern_registries(self, pattern):
+        if pattern in self._exact:
+            yield self._exact[pattern]
+
+        node = self._trie
+        for segment in pattern.split('.'):
+            if segment == '#':
+                if node.rest is not None:
+                    yield node.rest
+                return
+            node = node.children.get(segment)
+            if node is None:
+                return
+
+        if node.observers is not None:
+            yield node.observers
+
+    def _matching_registries(self, topic):
+        yield self._observers
+
+        registry = self._exact.get(topic)
+        if registry is not None:
+            yield registry
+
+        nodes = [self._trie]
+        for segment in topic.split('.'):
+            next_nodes = []
+            for node in nodes:
+                if node.rest is not None:
+                    yield node.rest
+                for key in (segment, '*'):
+                    child = node.children.get(key)
+                    if child is not None:
+                        next_nodes.append(child)
+            if not next_nodes:
+                return
+            nodes = next_nodes
+
+        for node in nodes:
+            if node.observers is not None:
+                yield node.observers
+            if node.rest is not None:
+                yield node.rest
+
+    def _matching_observers(self, message):
+        seen = set()
+
+        for registry in self._matching_registries(message.topic):
+            for observer in registry:
+                key = _key(observer)
+                if key not in seen:
+                    seen.add(key)
+                    yield observer
+
+        for predicate, registry in self._predicates.items():
+            if predicate(message):
+                for observer in registry:
+                    key = _key(observer)
+                    if key not in seen:
+                        seen.add(key)
+                        yield observer
+
+    def publish(self, topic, payload=None):
+        self._notify(Message(topic, payload))
+
+
+class ProcessEventBus(EventBus):
+    """EventBus that also forwards publications to buses in other processes
+
+    Every process owns an inbox (multiprocessing.Queue); publish() delivers locally
+    and puts the message into the inboxes of all peers. listen() starts a thread
+    that publishes messages arriving in the inbox on the local bus.
+    """
+
+    def __init__(self, inbox=None, peers=(), dispatcher=None):
+        super().__init__(dispatcher)
+        self.inbox = inbox if inbox is not None else multiprocessing.Queue()
+        self.peers = list(peers)
+        self._listener = None
+
+    def publish(self, topic, payload=None):
+        super().publish(topic, payload)
+        for peer in self.peers:
+            peer.put((topic, payload))
+
+    def listen(self):
+        self._listener = threading.Thread(target=self._receive, name='event-bus-listener', daemon=True)
+        self._listener.start()
+
+    def _receive(self):
+        while (item := self.inbox.get()) is not None:
+            EventBus.publish(self, *item)
+
+    def close(self):
+        if self._listener is not None:
+            self.inbox.put(None)
+            self._listener.join()
+            self._listener = None
+
+
+def _print_message(sender, message):
+    print(f'[{multiprocessing.current_process().name}] {message.topic}: {message.payload}')
+
+
+def _worker(inbox, done):
+    bus = ProcessEventBus(inbox)
+    bus.subscribe('orders.#', _print_message)
+    bus.listen()
+    done.wait()
+    bus.close()
+
+
+def main():
+    bus = EventBus()
+    bus.subscribe('orders.created', _print_message)
+    bus.subscribe('orders.*.shipped', _print_message)
+    bus.subscribe_where(lambda message: message.payload == 'urgent', _print_message)
+
+    bus.publish('orders.created', 1)
+    bus.publish('orders.42.shipped', 2)
+    bus.publish('invoices.paid', 'urgent')
+    bus.publish('invoices.paid', 'ignored')
+
+    print('*' * 40)
+
+    inbox, done = multiprocessing.Queue(), multiprocessing.Event()
+    worker = multiprocessing.Process(target=_worker, args=(inbox, done), name='worker')
+    worker.start()
+
+    remote = ProcessEventBus(peers=[inbox])
+    remote.subscribe('orders.#', _print_message)
+    remote.publish('orders.created', 3)
+    remote.publish('users.created', 4)
+
+    done.set()
+    worker.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,34 @@
 import abc
 
+from observer_registry import ObserverRegistry
+
 
 class Subject:
-    def __init__(self):
-        self._observers = set()
+    def __init__(self, dispatcher=None):
+        self._observers = ObserverRegistry()
+        self._dispatcher = dispatcher
 
-    def register_observer(self, observer):
-        self._observers.add(observer)
+    def register_observer(self, observer, weak=True):
+        self._observers.add(observer, weak)
 
     def unregister_observer(self, observer):
         self._observers.remove(observer)
 
+    def _matching_observers(self, event):
+        return self._observers
+
     def _notify(self, event):
-        for observer in self._observers:
+        if self._dispatcher is not None:
+            self._dispatcher.submit(self, event)
+            return
+
+        for observer in self._matching_observers(event):
             observer(self, event)
 
 
 class ConcreteSubject(Subject):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, dispatcher=None):
+        super().__init__(dispatcher)
         self._data = 0.0
 
     @property
@@ -0,0 +1,320 @@
+import asyncio
+from collections import OrderedDict, deque
+from enum import Enum
+import inspect
+import threading
+import time
+from types import MethodType
+import weakref
+
+from observer import ConcreteSubject, ConcreteObserver, log
+from observer_registry import _StrongRef, _key
+
+
+class Overflow(Enum):
+    BLOCK = 'block'              # producer waits for free space
+    DROP_NEWEST = 'drop_newest'  # incoming event is discarded
+    DROP_OLDEST = 'drop_oldest'  # oldest queued event is discarded
+
+
+class LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.queued_total = 0.0
+        self.errors = 0
+
+    def record(self, elapsed, queued, failed=False):
+        self.count += 1
+        self.errors += failed
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.queued_total += queued
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def mean_queued(self):
+        return self.queued_total / self.count if self.count else 0.0
+
+    def __repr__(self):
+        return (f'<LatencyStats count={self.count} errors={self.errors} mean={self.mean * 1e6:.1f}us '
+                f'max={self.max * 1e6:.1f}us queued={self.mean_queued * 1e6:.1f}us>')
+
+
+class EventQueue:
+    """Bounded queue of (subject, event, enqueue time)
+
+    With coalesce=True only the latest pending event of every subject is kept.
+    """
+
+    def __init__(self, maxsize=10_000, overflow=Overflow.BLOCK, coalesce=False):
+        self.maxsize = maxsize
+        self.overflow = Overflow(overflow)
+        self.coalesce = coalesce
+        self.dropped = 0
+        self.coalesced = 0
+        self._items = OrderedDict() if coalesce else deque()
+        self._unfinished = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+        self._closed = False
+
+    def put(self, subject, event):
+        """Enqueue an event - returns False if it was dropped"""
+        item = (subject, event, time.perf_counter())
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('event queue is closed')
+
+            if self.coalesce and subject in self._items:
+                self._items[subject] = item
+                self.coalesced += 1
+                return True
+
+            while len(self._items) >= self.maxsize:
+                if self.overflow is Overflow.DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.overflow is Overflow.DROP_OLDEST:
+                    self._pop()
+                    self._done(1)
+                    self.dropped += 1
+                    break
+                self._not_full.wait()
+
+            if self.coalesce:
+                self._items[subject] = item
+            else:
+                self._items.append(item)
+            self._unfinished += 1
+            self._not_empty.notify()
+
+        return True
+
+    def _pop(self):
+        if self.coalesce:
+            return self._items.popitem(last=False)[1]
+        return self._items.popleft()
+
+    def get_batch(self, max_items=256, timeout=None):
+        """Remove up to max_items events - blocks until one is available
+
+        Returns an empty list on timeout and None when the queue is closed and drained.
+        """
+        with self._lock:
+            if not self._items and not self._closed:
+                self._not_empty.wait(timeout)
+            if not self._items:
+                return None if self._closed else []
+
+            batch = [self._pop() for _ in range(min(max_items, len(self._items)))]
+            self._not_full.notify_all()
+
+        return batch
+
+    def _done(self, count):
+        self._unfinished -= count
+        if not self._unfinished:
+            self._all_done.notify_all()
+
+    def task_done(self, count=1):
+        """Mark count events taken with get_batch as delivered"""
+        with self._lock:
+            self._done(count)
+
+    def join(self, timeout=None):
+        """Wait until every enqueued event has been delivered or dropped"""
+        with self._lock:
+            return self._all_done.wait_for(lambda: not self._unfinished, timeout)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+class ObserverMetrics:
+    """LatencyStats per observer, keyed like ObserverRegistry
+
+    Observers are held by weak references, so collecting metrics does not keep them
+    alive; the stats of an observer are dropped when it is garbage collected.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._refs = {}
+
+    def __getitem__(self, observer):
+        key = _key(observer)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = LatencyStats()
+            self._refs[key] = self._ref(observer, key)
+        return stats
+
+    def _ref(self, observer, key):
+        self_ref = weakref.ref(self)
+
+        def callback(ref):
+            metrics = self_ref()
+            if metrics is not None and metrics._refs.get(key) is ref:
+                del metrics._refs[key], metrics._stats[key]
+
+        try:
+            if isinstance(observer, MethodType):
+                return weakref.WeakMethod(observer, callback)
+            return weakref.ref(observer, callback)
+        except TypeError:
+            return _StrongRef(observer)
+
+    def items(self):
+        for key, ref in list(self._refs.items()):
+            observer = ref()
+            if observer is not None:
+                yield observer, self._stats[key]
+
+    def __len__(self):
+        return len(self._stats)
+
+
+class _Dispatcher:
+    def __init__(self, maxsize, overflow, coalesce, batch_size):
+        self.queue = EventQueue(maxsize, overflow, coalesce)
+        self.batch_size = batch_size
+        self.metrics = ObserverMetrics()
+
+    def submit(self, subject, event):
+        return self.queue.put(subject, event)
+
+    def _observers(self, subject, event):
+        return tuple(subject._matching_observers(event))
+
+
+class ThreadedDispatcher(_Dispatcher):
+    """Delivers events to observers on a background worker thread"""
+
+    def __init__(self, maxsize=10_000, overflow=Overflow.BLOCK, coalesce=False, batch_size=256):
+        super().__init__(maxsize, overflow, coalesce, batch_size)
+        self._worker = threading.Thread(target=self._run, name='observer-dispatcher', daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while (batch := self.queue.get_batch(self.batch_size, timeout=0.1)) is not None:
+            try:
+                for subject, event, enqueued in batch:
+                    for observer in self._observers(subject, event):
+                        self._deliver(observer, subject, event, enqueued)
+            finally:
+                self.queue.task_done(len(batch))
+
+    def _deliver(self, observer, subject, event, enqueued):
+        start = time.perf_counter()
+        failed = False
+        try:
+            observer(subject, event)
+        except Exception:
+            failed = True
+        self.metrics[observer].record(time.perf_counter() - start, start - enqueued, failed)
+
+    def flush(self, timeout=None):
+        """Wait until all queued events have been delivered"""
+        return self.queue.join(timeout)
+
+    def close(self):
+        self.queue.close()
+        self._worker.join()
+
+
+class AsyncioDispatcher(_Dispatcher):
+    """Delivers events from a task on an asyncio loop - observers may be coroutine functions
+
+    Producers may run in any thread; BLOCK is not supported as it would stall the loop.
+    """
+
+    def __init__(self, loop=None, maxsize=10_000, overflow=Overflow.DROP_OLDEST, coalesce=False, batch_size=256):
+        if Overflow(overflow) is Overflow.BLOCK:
+            raise ValueError('AsyncioDispatcher does not support Overflow.BLOCK')
+        super().__init__(maxsize, overflow, coalesce, batch_size)
+        self.loop = loop or asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self.loop.create_task(self._run())
+
+    def submit(self, subject, event):
+        accepted = super().submit(subject, event)
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+        return accepted
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            while batch := self.queue.get_batch(self.batch_size, timeout=0):
+                try:
+                    for subject, event, enqueued in batch:
+                        for observer in self._observers(subject, event):
+                            await self._deliver(observer, subject, event, enqueued)
+                finally:
+                    self.queue.task_done(len(batch))
+
+            if batch is None:
+                break
+
+    async def _deliver(self, observer, subject, event, enqueued):
+        start = time.perf_counter()
+        failed = False
+        try:
+            result = observer(subject, event)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            failed = True
+        self.metrics[observer].record(time.perf_counter() - start, start - enqueued, failed)
+
+    async def flush(self):
+        while not self.queue.join(timeout=0):
+            await asyncio.sleep(0.001)
+
+    async def close(self):
+        self.queue.close()
+        self._wakeup.set()
+        await self._task
+
+
+def main():
+    def slow_log(sender, event_args):
+        time.sleep(0.01)
+        log(sender, event_args)
+
+    dispatcher = ThreadedDispatcher(maxsize=100, coalesce=True)
+    cs = ConcreteSubject(dispatcher)
+    concrete_observer = ConcreteObserver(1)  # registered weakly - keep it alive
+    cs.register_observer(slow_log)
+    cs.register_observer(concrete_observer)
+
+    start = time.perf_counter()
+    for i in range(1000):
+        cs.data = float(i)
+    print(f'producer finished in {(time.perf_counter() - start) * 1e3:.1f} ms')
+
+    dispatcher.flush()
+    dispatcher.close()
+
+    print(f'coalesced events: {dispatcher.queue.coalesced}')
+    for observer, stats in dispatcher.metrics.items():
+        print(observer, stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+from types import MethodType
+import weakref
+
+
+def _key(observer):
+    if isinstance(observer, MethodType):
+        return id(observer.__self__), id(observer.__func__)
+    return id(observer)
+
+
+class _StrongRef:
+    __slots__ = ('observer',)
+
+    def __init__(self, observer):
+        self.observer = observer
+
+    def __call__(self):
+        return self.observer
+
+
+class ObserverRegistry:
+    """Insertion-ordered set of observers held by weak references
+
+    Bound methods are held with WeakMethod, so registering obj.method does not keep obj alive.
+    Dead entries disappear automatically. add/remove are O(1); iterating does not copy
+    the registry - changes made while it is being iterated are applied afterwards.
+    """
+
+    def __init__(self):
+        self._refs = {}
+        self._iterating = 0
+        self._pending = []
+
+    def add(self, observer, weak=True):
+        key = _key(observer)
+        if not weak:
+            ref = _StrongRef(observer)
+        elif isinstance(observer, MethodType):
+            ref = weakref.WeakMethod(observer, self._make_callback(key))
+        else:
+            ref = weakref.ref(observer, self._make_callback(key))
+        self._apply(self._store, key, ref)
+
+    def remove(self, observer):
+        key = _key(observer)
+        if key not in self._refs and not self._iterating:
+            raise KeyError(observer)
+        self._apply(self._pop, key, None)
+
+    def _make_callback(self, key):
+        self_ref = weakref.ref(self)
+
+        def callback(ref):
+            registry = self_ref()
+            if registry is not None:
+                registry._apply(registry._discard, key, ref)
+
+        return callback
+
+    def _apply(self, operation, key, ref):
+        if self._iterating:
+            self._pending.append((operation, key, ref))
+        else:
+            operation(key, ref)
+
+    def _store(self, key, ref):
+        self._refs[key] = ref
+
+    def _pop(self, key, ref):
+        self._refs.pop(key, None)
+
+    def _discard(self, key, ref):
+        if self._refs.get(key) is ref:
+            del self._refs[key]
+
+    def __iter__(self):
+        self._iterating += 1
+        try:
+            for ref in self._refs.values():
+                observer = ref()
+                if observer is not None:
+                    yield observer
+        finally:
+            self._iterating -= 1
+            if not self._iterating and self._pending:
+                pending, self._pending = self._pending, []
+                for operation, key, ref in pending:
+                    operation(key, ref)
+
+    def __contains__(self, observer):
+        ref = self._refs.get(_key(observer))
+        return ref is not None and ref() is not None
+
+    def __len__(self):
+        return len(self._refs)
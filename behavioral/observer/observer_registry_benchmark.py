@@ -0,0 +1,48 @@
+import timeit
+
+from observer import ConcreteSubject
+
+
+class SetSubject:
+    """Subject before the weak registry - strong references in a set"""
+
+    def __init__(self):
+        self._observers = set()
+
+    def register_observer(self, observer):
+        self._observers.add(observer)
+
+    def _notify(self, event):
+        for observer in self._observers:
+            observer(self, event)
+
+
+class NullObserver:
+    def __call__(self, sender, event_args):
+        pass
+
+    def on_event(self, sender, event_args):
+        pass
+
+
+def main(counts=(10, 10**3, 10**5)):
+    print(f"{'observers':>10} {'set [us]':>10} {'registry [us]':>14} {'bound methods [us]':>19}")
+
+    for count in counts:
+        observers = [NullObserver() for _ in range(count)]
+
+        set_subject, registry_subject, method_subject = SetSubject(), ConcreteSubject(), ConcreteSubject()
+        for o in observers:
+            set_subject.register_observer(o)
+            registry_subject.register_observer(o)
+            method_subject.register_observer(o.on_event)
+
+        number = max(1, 10**5 // count)
+        timings = [min(timeit.repeat(lambda: subject._notify(1.0), number=number, repeat=5)) / number
+                   for subject in (set_subject, registry_subject, method_subject)]
+
+        print(f'{count:>10} ' + ' '.join(f'{t * 1e6:>{w}.1f}' for t, w in zip(timings, (10, 14, 19))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import multiprocessing
+
+import pytest
+
+from event_bus import EventBus, ProcessEventBus
+
+
+class Recorder:
+    def __init__(self):
+        self.topics = []
+
+    def __call__(self, sender, message):
+        self.topics.append(message.topic)
+
+    def record(self, sender, message):
+        self.topics.append(message.topic)
+
+
+TOPICS = ['orders', 'orders.created', 'orders.42.shipped', 'orders.42.paid', 'users.created']
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ('orders.created', ['orders.created']),
+    ('orders.*', ['orders.created']),
+    ('orders.*.shipped', ['orders.42.shipped']),
+    ('orders.#', ['orders', 'orders.created', 'orders.42.shipped', 'orders.42.paid']),
+    ('*.created', ['orders.created', 'users.created']),
+    ('#', TOPICS),
+])
+def test_topic_patterns(pattern, expected):
+    bus = EventBus()
+    recorder = Recorder()
+    bus.subscribe(pattern, recorder)
+
+    for topic in TOPICS:
+        bus.publish(topic)
+
+    assert recorder.topics == expected
+
+
+@pytest.mark.parametrize('observer', [lambda recorder: recorder, lambda recorder: recorder.record],
+                         ids=['callable', 'bound method'])
+def test_observer_matching_several_subscriptions_is_notified_once(observer):
+    bus = EventBus()
+    recorder = Recorder()
+    bus.subscribe('orders.created', observer(recorder))
+    bus.subscribe('orders.*', observer(recorder))
+    bus.subscribe_where(lambda message: message.topic.startswith('orders'), observer(recorder))
+
+    bus.publish('orders.created')
+
+    assert recorder.topics == ['orders.created']
+
+
+def test_predicate_subscription_and_unsubscribe():
+    bus = EventBus()
+    recorder = Recorder()
+
+    def is_large(message):
+        return message.payload > 100
+
+    bus.subscribe_where(is_large, recorder)
+    bus.publish('a', 10)
+    bus.publish('b', 1000)
+    bus.unsubscribe_where(is_large, recorder)
+    bus.publish('c', 1000)
+
+    assert recorder.topics == ['b']
+
+
+def test_unsubscribe_pattern():
+    bus = EventBus()
+    recorder = Recorder()
+    bus.subscribe('orders.#', recorder)
+    bus.unsubscribe('orders.#', recorder)
+
+    bus.publish('orders.created')
+
+    assert recorder.topics == []
+    with pytest.raises(KeyError):
+        bus.unsubscribe('orders.#', recorder)
+
+
+def test_process_bus_forwards_to_peer_inbox():
+    inbox = multiprocessing.Queue()
+    receiver = ProcessEventBus(inbox)
+    recorder = Recorder()
+    receiver.subscribe('orders.*', recorder)
+    receiver.listen()
+
+    sender = ProcessEventBus(peers=[inbox])
+    sender.publish('orders.created', 1)
+    sender.publish('users.created', 2)
+    receiver.close()
+
+    assert recorder.topics == ['orders.created']
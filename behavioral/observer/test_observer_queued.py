@@ -0,0 +1,105 @@
+import asyncio
+import gc
+import threading
+import weakref
+
+from observer import ConcreteSubject
+from observer_queued import EventQueue, Overflow, ThreadedDispatcher, AsyncioDispatcher
+
+
+def test_drop_policies():
+    newest = EventQueue(maxsize=2, overflow=Overflow.DROP_NEWEST)
+    oldest = EventQueue(maxsize=2, overflow=Overflow.DROP_OLDEST)
+    for event in range(4):
+        newest.put('s', event)
+        oldest.put('s', event)
+
+    assert [e for _, e, _ in newest.get_batch()] == [0, 1]
+    assert [e for _, e, _ in oldest.get_batch()] == [2, 3]
+    assert newest.dropped == oldest.dropped == 2
+
+
+def test_coalescing_keeps_latest_event_per_subject():
+    queue = EventQueue(coalesce=True)
+    for event in range(3):
+        queue.put('a', event)
+        queue.put('b', event * 10)
+
+    assert [(s, e) for s, e, _ in queue.get_batch()] == [('a', 2), ('b', 20)]
+    assert queue.coalesced == 4
+
+
+def test_threaded_delivery_does_not_block_producer():
+    release = threading.Event()
+    received = []
+
+    def slow_observer(sender, event):
+        release.wait()
+        received.append(event)
+
+    def failing_observer(sender, event):
+        raise ValueError(event)
+
+    dispatcher = ThreadedDispatcher()
+    subject = ConcreteSubject(dispatcher)
+    subject.register_observer(slow_observer)
+    subject.register_observer(failing_observer)
+
+    for i in range(1, 101):
+        subject.data = float(i)
+
+    assert len(received) < 100
+    release.set()
+    assert dispatcher.flush(timeout=5)
+    dispatcher.close()
+
+    assert received == [float(i) for i in range(1, 101)]
+    assert dispatcher.metrics[slow_observer].count == 100
+    assert dispatcher.metrics[failing_observer].errors == 100
+
+
+def test_asyncio_delivery_awaits_coroutine_observers():
+    received = []
+
+    async def observer(sender, event):
+        await asyncio.sleep(0)
+        received.append(event)
+
+    async def run():
+        dispatcher = AsyncioDispatcher()
+        subject = ConcreteSubject(dispatcher)
+        subject.register_observer(observer)
+
+        for i in range(1, 11):
+            subject.data = float(i)
+
+        await dispatcher.flush()
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+
+    assert received == [float(i) for i in range(1, 11)]
+    assert dispatcher.metrics[observer].count == 10
+
+
+def test_metrics_do_not_keep_observers_alive():
+    class Observer:
+        def __call__(self, sender, event):
+            pass
+
+    dispatcher = ThreadedDispatcher()
+    subject = ConcreteSubject(dispatcher)
+    observer = Observer()
+    subject.register_observer(observer)
+    subject.data = 1.0
+    assert dispatcher.flush(timeout=5)
+    assert [stats.count for _, stats in dispatcher.metrics.items()] == [1]
+
+    observer_ref = weakref.ref(observer)
+    del observer
+    gc.collect()
+    dispatcher.close()
+
+    assert observer_ref() is None
+    assert len(dispatcher.metrics) == 0
@@ -0,0 +1,74 @@
+import gc
+
+from observer import ConcreteSubject
+from observer_registry import ObserverRegistry
+
+
+class Recorder:
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+
+    def on_event(self, sender, event):
+        self.log.append((self.name, event))
+
+
+def test_notifies_in_registration_order():
+    log = []
+    recorders = [Recorder(log, i) for i in range(5)]
+    subject = ConcreteSubject()
+    for r in recorders:
+        subject.register_observer(r.on_event)
+
+    subject.data = 1.0
+
+    assert log == [(i, 1.0) for i in range(5)]
+
+
+def test_dead_observers_are_removed():
+    log = []
+    subject = ConcreteSubject()
+    kept, dropped = Recorder(log, 'kept'), Recorder(log, 'dropped')
+    subject.register_observer(kept.on_event)
+    subject.register_observer(dropped.on_event)
+
+    del dropped
+    gc.collect()
+    subject.data = 1.0
+
+    assert log == [('kept', 1.0)]
+    assert len(subject._observers) == 1
+
+
+def test_strong_registration_keeps_lambda_alive():
+    log = []
+    subject = ConcreteSubject()
+    subject.register_observer(lambda sender, event: log.append(event), weak=False)
+
+    gc.collect()
+    subject.data = 2.0
+
+    assert log == [2.0]
+
+
+def test_unregister_during_notify_is_applied_afterwards():
+    registry = ObserverRegistry()
+    log = []
+
+    def first(sender, event):
+        log.append('first')
+        registry.remove(second)
+
+    def second(sender, event):
+        log.append('second')
+
+    registry.add(first)
+    registry.add(second)
+
+    for observer in registry:
+        observer(None, None)
+    for observer in registry:
+        observer(None, None)
+
+    assert log == ['first', 'second', 'first']
+    assert second not in registry
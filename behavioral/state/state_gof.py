@@ -1,5 +1,10 @@
 import abc
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class TurnstileAPI:
 
@@ -88,7 +93,7 @@ class TurnstileFSM_After:
 
     def __init__(self, turnstile_api):
         self.turnstile_api = turnstile_api
-        self.__state = LockedState()
+        self.__state = locked_state
 
     def coin(self):
         self.__state = self.__state.coin(self.turnstile_api)
@@ -101,6 +106,184 @@ class TurnstileFSM_After:
         return self.__state.name
 
 
+# integer events of the table-driven FSM
+COIN, PASS_GATE = 0, 1
+
+
+class _RecordingAPI:
+    """Turnstile API recording the calls made by a state object"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, method):
+        return lambda *args: self.calls.append((method, args))
+
+
+class TransitionTable:
+    """Transition table compiled from singleton state objects
+
+    States and events are small integers (indexes into states and events). Each
+    state's event method is run once against a recording API, giving an
+    events x states matrix of next states and of action ids; actions[action id]
+    holds the API calls to make. Both matrices are flattened into bytes indexed by
+    event * len(states) + state, so they can also be applied with bytes.translate.
+    """
+
+    def __init__(self, states, events):
+        if len(states) * len(events) > 256:
+            raise ValueError('at most 256 (event, state) pairs are supported')
+
+        self.states = list(states)
+        self.events = list(events)
+        self.names = [state.name for state in self.states]
+        self.actions = []
+        next_states, action_ids = [], []
+
+        for event in self.events:
+            for state in self.states:
+                api = _RecordingAPI()
+                next_state = getattr(state, event)(api)
+                calls = tuple(api.calls)
+                if calls not in self.actions:
+                    self.actions.append(calls)
+                next_states.append(self.states.index(next_state))
+                action_ids.append(self.actions.index(calls))
+
+        self.next_state = bytes(next_states)
+        self.action = bytes(action_ids)
+
+    def step(self, state, event):
+        """Return (next state, action id)"""
+        i = event * len(self.states) + state
+        return self.next_state[i], self.action[i]
+
+    def replay(self, events, state=0):
+        """Apply an event log to one FSM - returns the final state and the action ids as bytes"""
+        next_state, action, width = self.next_state, self.action, len(self.states)
+        actions = bytearray(len(events))
+        for position, event in enumerate(events):
+            i = event * width + state
+            actions[position] = action[i]
+            state = next_state[i]
+        return state, bytes(actions)
+
+    def perform(self, action, api):
+        for method, args in self.actions[action]:
+            getattr(api, method)(*args)
+
+
+turnstile_table = TransitionTable([locked_state, unlocked_state], ['coin', 'pass_gate'])
+
+
+class TurnstileFSM_Table:
+    """TurnstileFSM_After driven by a TransitionTable instead of state objects"""
+
+    def __init__(self, turnstile_api, table=turnstile_table):
+        self.turnstile_api = turnstile_api
+        self.table = table
+        self._state = 0
+
+    def _handle(self, event):
+        self._state, action = self.table.step(self._state, event)
+        self.table.perform(action, self.turnstile_api)
+
+    def coin(self):
+        self._handle(COIN)
+
+    def pass_gate(self):
+        self._handle(PASS_GATE)
+
+    def replay(self, events):
+        """Apply a log of COIN/PASS_GATE events, calling the API for every action"""
+        self._state, actions = self.table.replay(events, self._state)
+        for action in actions:
+            self.table.perform(action, self.turnstile_api)
+
+    @property
+    def state(self):
+        return self.table.names[self._state]
+
+
+_REPLAY_BLOCK_BYTES = 1 << 20
+
+
+class TurnstileArray:
+    """States of many independent turnstiles stepped together
+
+    step(events) takes one event per turnstile (bytes-like or a NumPy array) and
+    returns the action ids. With NumPy the lookups write into preallocated
+    buffers (the returned array is reused by the next step); without it all turnstiles are stepped with one big-integer
+    multiply-add and bytes.translate.
+    """
+
+    def __init__(self, count, table=turnstile_table):
+        self.table = table
+        self.count = count
+        if np is not None:
+            self.states = np.zeros(count, dtype=np.uint8)
+            self._index = np.empty(count, dtype=np.intp)
+            self._actions = np.empty(count, dtype=np.uint8)
+            self._next_state = np.frombuffer(table.next_state, dtype=np.uint8)
+            self._action = np.frombuffer(table.action, dtype=np.uint8)
+        else:
+            self.states = bytes(count)
+            self._next_state = table.next_state.ljust(256, b'\0')
+            self._action = table.action.ljust(256, b'\0')
+
+    def step(self, events):
+        if len(events) != self.count:
+            raise ValueError(f'expected {self.count} events, got {len(events)}')
+        width = len(self.table.states)
+        if np is not None and isinstance(events, (bytes, bytearray, memoryview)):
+            events = np.frombuffer(events, dtype=np.uint8)
+        # an unknown event would index past the table (NumPy) or into its padding (bytes.translate)
+        if self.count and (max(events) if np is None else events.max()) >= len(self.table.events):
+            raise ValueError(f'events must be below {len(self.table.events)}')
+
+        if np is None:
+            # event * width + state never exceeds a byte, so no lane carries into the next one
+            index = (int.from_bytes(events, 'little') * width + int.from_bytes(self.states, 'little'))
+            index = index.to_bytes(self.count, 'little')
+            self.states = index.translate(self._next_state)
+            return index.translate(self._action)
+
+        index = self._index
+        np.multiply(events, width, out=index, casting='unsafe')
+        index += self.states
+        np.take(self._action, index, out=self._actions)
+        np.take(self._next_state, index, out=self.states)
+        return self._actions
+
+    def replay(self, log):
+        """Apply a log of per-turnstile event rows - returns how often each action was taken"""
+        action_count = len(self.table.actions)
+        if np is None:
+            counts = [0] * action_count
+            for events in log:
+                actions = self.step(events)
+                for action in range(action_count):
+                    counts[action] += actions.count(action)
+            return counts
+
+        # the actions of up to `rows` steps are collected and counted with a single bincount
+        counts = np.zeros(action_count, dtype=np.int64)
+        rows = max(1, _REPLAY_BLOCK_BYTES // max(self.count, 1))
+        block = np.empty((rows, self.count), dtype=np.uint8)
+        filled = 0
+        for events in log:
+            block[filled] = self.step(events)
+            filled += 1
+            if filled == rows:
+                counts += np.bincount(block.ravel(), minlength=action_count)
+                filled = 0
+        counts += np.bincount(block[:filled].ravel(), minlength=action_count)
+        return counts.tolist()
+
+    def names(self):
+        return [self.table.names[state] for state in self.states]
+
+
 TurnstileFSM = TurnstileFSM_After
 
 
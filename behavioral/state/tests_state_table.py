@@ -0,0 +1,148 @@
+import random
+import unittest
+
+import state_gof
+from state_gof import (COIN, PASS_GATE, TransitionTable, TurnstileArray, TurnstileFSM_After, TurnstileFSM_Table,
+                       locked_state, turnstile_table, unlocked_state)
+
+
+class MockTurnstile:
+
+    def __init__(self):
+        self.actions = []
+
+    def unlock(self):
+        self.actions.append('U')
+
+    def raise_alarm(self):
+        self.actions.append('A')
+
+    def display(self, message):
+        self.actions.append(message)
+
+    def lock(self):
+        self.actions.append('L')
+
+
+def random_events(rng, count):
+    return [rng.choice((COIN, PASS_GATE)) for _ in range(count)]
+
+
+def run_objects(events):
+    api = MockTurnstile()
+    fsm = TurnstileFSM_After(api)
+    for event in events:
+        (fsm.coin if event == COIN else fsm.pass_gate)()
+    return fsm.state, api.actions
+
+
+class TransitionTableTest(unittest.TestCase):
+
+    def test_table_is_compiled_from_state_objects(self):
+        table = TransitionTable([locked_state, unlocked_state], ['coin', 'pass_gate'])
+        self.assertEqual(table.names, ['LOCKED', 'UNLOCKED'])
+        self.assertEqual(table.step(0, COIN), (1, table.actions.index((('unlock', ()),))))
+        self.assertEqual(table.step(1, PASS_GATE), (0, table.actions.index((('lock', ()),))))
+
+    def test_table_fsm_matches_object_fsm(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            events = random_events(rng, rng.randint(0, 30))
+
+            api = MockTurnstile()
+            fsm = TurnstileFSM_Table(api)
+            for event in events:
+                (fsm.coin if event == COIN else fsm.pass_gate)()
+            self.assertEqual((fsm.state, api.actions), run_objects(events))
+
+            api = MockTurnstile()
+            fsm = TurnstileFSM_Table(api)
+            fsm.replay(bytes(events))
+            self.assertEqual((fsm.state, api.actions), run_objects(events))
+
+    def test_after_fsm_uses_singleton_states(self):
+        fsm = TurnstileFSM_After(MockTurnstile())
+        self.assertIs(fsm._TurnstileFSM_After__state, locked_state)
+
+
+class TurnstileArrayTest(unittest.TestCase):
+
+    def check_against_objects(self):
+        rng = random.Random(2)
+        count, steps = 50, 20
+        log = [bytes(random_events(rng, count)) for _ in range(steps)]
+
+        turnstiles = TurnstileArray(count)
+        counts = turnstiles.replay(log)
+
+        expected_counts = [0] * len(turnstile_table.actions)
+        for column in range(count):
+            events = [row[column] for row in log]
+            state, actions = run_objects(events)
+            self.assertEqual(turnstiles.names()[column], state)
+
+            _, action_ids = turnstile_table.replay(events)
+            for action in action_ids:
+                expected_counts[action] += 1
+            performed = MockTurnstile()
+            for action in action_ids:
+                turnstile_table.perform(action, performed)
+            self.assertEqual(performed.actions, actions)
+
+        self.assertEqual(counts, expected_counts)
+
+    def test_numpy(self):
+        if state_gof.np is None:
+            self.skipTest('NumPy is not installed')
+        self.check_against_objects()
+
+    def test_without_numpy(self):
+        np, state_gof.np = state_gof.np, None
+        try:
+            self.check_against_objects()
+        finally:
+            state_gof.np = np
+
+    def test_wrong_number_of_events(self):
+        with self.assertRaises(ValueError):
+            TurnstileArray(3).step(bytes(2))
+
+    def check_unknown_event(self):
+        turnstiles = TurnstileArray(3)
+        with self.assertRaises(ValueError):
+            turnstiles.step(bytes([COIN, 5, PASS_GATE]))
+        self.assertEqual(turnstiles.names(), ['LOCKED'] * 3)
+
+    def test_unknown_event_numpy(self):
+        if state_gof.np is None:
+            self.skipTest('NumPy is not installed')
+        self.check_unknown_event()
+
+    def test_unknown_event_without_numpy(self):
+        np, state_gof.np = state_gof.np, None
+        try:
+            self.check_unknown_event()
+        finally:
+            state_gof.np = np
+
+    def test_replay_spanning_several_count_blocks(self):
+        if state_gof.np is None:
+            self.skipTest('NumPy is not installed')
+        rng = random.Random(3)
+        log = [bytes(random_events(rng, 4)) for _ in range(25)]
+        block_bytes, state_gof._REPLAY_BLOCK_BYTES = state_gof._REPLAY_BLOCK_BYTES, 4 * 10
+        try:
+            counts = TurnstileArray(4).replay(log)
+        finally:
+            state_gof._REPLAY_BLOCK_BYTES = block_bytes
+
+        np, state_gof.np = state_gof.np, None
+        try:
+            expected = TurnstileArray(4).replay(log)
+        finally:
+            state_gof.np = np
+        self.assertEqual(counts, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
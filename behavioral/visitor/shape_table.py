@@ -0,0 +1,159 @@
+from array import array
+import math
+import random
+import sys
+import time
+
+from visitor_shapes import Circle, Rectangle, Line, AreaVisitor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ShapeBlock:
+    """Typed columns (array('d')) holding all shapes of one kind"""
+
+    def __init__(self, shape_type, fields):
+        self.shape_type = shape_type
+        self.fields = fields
+        self.columns = {field: array('d') for field in fields}
+
+    def append(self, shape):
+        for field, column in self.columns.items():
+            column.append(getattr(shape, field))
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]])
+
+    def __getitem__(self, index):
+        return self.shape_type(*(self.columns[field][index] for field in self.fields))
+
+    def column(self, field):
+        if np is not None:
+            return np.frombuffer(self.columns[field], dtype=np.float64)
+        return self.columns[field]
+
+
+class ShapeTable:
+    """Columnar store of Circles, Rectangles and Lines with vectorized reductions"""
+
+    kinds = ((Circle, ('x', 'y', 'radius')),
+             (Rectangle, ('x', 'y', 'width', 'height')),
+             (Line, ('x', 'y', 'endx', 'endy')))
+
+    def __init__(self):
+        self.blocks = [ShapeBlock(shape_type, fields) for shape_type, fields in self.kinds]
+        self.order = array('B')
+
+    @classmethod
+    def from_shapes(cls, shapes):
+        table = cls()
+        for shape in shapes:
+            table.append(shape)
+        return table
+
+    def append(self, shape):
+        for kind, block in enumerate(self.blocks):
+            if isinstance(shape, block.shape_type):
+                block.append(shape)
+                self.order.append(kind)
+                return
+        raise TypeError(f'unsupported shape: {type(shape).__name__}')
+
+    def to_shapes(self):
+        """Rebuild shape objects in their original order"""
+        positions = [0] * len(self.blocks)
+        shapes = []
+        for kind in self.order:
+            shapes.append(self.blocks[kind][positions[kind]])
+            positions[kind] += 1
+        return shapes
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def circles(self):
+        return self.blocks[0]
+
+    @property
+    def rectangles(self):
+        return self.blocks[1]
+
+    @property
+    def lines(self):
+        return self.blocks[2]
+
+    def area(self):
+        radius = self.circles.column('radius')
+        width, height = self.rectangles.column('width'), self.rectangles.column('height')
+
+        if np is not None:
+            return float(math.pi * np.dot(radius, radius) + np.dot(width, height))
+        return math.pi * sum(r * r for r in radius) + sum(w * h for w, h in zip(width, height))
+
+    def total_length(self):
+        lines = self.lines
+        dx = [lines.column('endx'), lines.column('x')]
+        dy = [lines.column('endy'), lines.column('y')]
+
+        if np is not None:
+            return float(np.hypot(dx[0] - dx[1], dy[0] - dy[1]).sum())
+        return math.fsum(math.hypot(ex - x, ey - y) for ex, x, ey, y in zip(*dx, *dy))
+
+    def bounding_box(self):
+        """Return (min_x, min_y, max_x, max_y) of all shapes or None for an empty table"""
+        circles, rects, lines = self.blocks
+        cx, cy, r = circles.column('x'), circles.column('y'), circles.column('radius')
+        rx, ry = rects.column('x'), rects.column('y')
+        rw, rh = rects.column('width'), rects.column('height')
+
+        if np is not None:
+            xs = [cx - r, cx + r, rx, rx + rw, lines.column('x'), lines.column('endx')]
+            ys = [cy - r, cy + r, ry, ry + rh, lines.column('y'), lines.column('endy')]
+            xs, ys = np.concatenate(xs), np.concatenate(ys)
+            if not xs.size:
+                return None
+            return float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())
+
+        xs = [*(x - rad for x, rad in zip(cx, r)), *(x + rad for x, rad in zip(cx, r)),
+              *rx, *(x + w for x, w in zip(rx, rw)), *lines.column('x'), *lines.column('endx')]
+        ys = [*(y - rad for y, rad in zip(cy, r)), *(y + rad for y, rad in zip(cy, r)),
+              *ry, *(y + h for y, h in zip(ry, rh)), *lines.column('y'), *lines.column('endy')]
+        if not xs:
+            return None
+        return min(xs), min(ys), max(xs), max(ys)
+
+
+def random_shapes(size, seed=42):
+    rnd = random.Random(seed)
+    kinds = [lambda: Circle(rnd.uniform(-100, 100), rnd.uniform(-100, 100), rnd.uniform(0, 10)),
+             lambda: Rectangle(rnd.uniform(-100, 100), rnd.uniform(-100, 100), rnd.uniform(0, 10), rnd.uniform(0, 10)),
+             lambda: Line(rnd.uniform(-100, 100), rnd.uniform(-100, 100), rnd.uniform(-100, 100), rnd.uniform(-100, 100))]
+    return [rnd.choice(kinds)() for _ in range(size)]
+
+
+def main(size):
+    shapes = random_shapes(size)
+
+    start = time.perf_counter()
+    area_visitor = AreaVisitor()
+    for s in shapes:
+        area_visitor.visit(s)
+    visited = time.perf_counter() - start
+
+    table = ShapeTable.from_shapes(shapes)
+
+    start = time.perf_counter()
+    area = table.area()
+    vectorized = time.perf_counter() - start
+
+    print(f'{size} shapes: visitor area = {area_visitor.area:.6f} in {visited:.3f}s, '
+          f'table area = {area:.6f} in {vectorized:.3f}s')
+    print(f'bounding box = {table.bounding_box()}, total length = {table.total_length():.3f}')
+
+
+if __name__ == '__main__':
+    main(int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**6)
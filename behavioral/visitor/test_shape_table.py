@@ -0,0 +1,56 @@
+import math
+
+import pytest
+
+import shape_table
+from shape_table import ShapeTable, random_shapes
+from visitor_shapes import Circle, Rectangle, Line, AreaVisitor
+
+backend_module = shape_table
+
+
+@pytest.fixture
+def shapes():
+    return random_shapes(3000, seed=5)
+
+
+def test_area_matches_area_visitor(backend, shapes):
+    area_visitor = AreaVisitor()
+    for s in shapes:
+        area_visitor.visit(s)
+
+    assert ShapeTable.from_shapes(shapes).area() == pytest.approx(area_visitor.area, rel=1e-12)
+
+
+def test_total_length_and_bounding_box(backend, shapes):
+    table = ShapeTable.from_shapes(shapes)
+    lines = [s for s in shapes if isinstance(s, Line)]
+
+    assert table.total_length() == pytest.approx(sum(math.hypot(l.endx - l.x, l.endy - l.y) for l in lines))
+
+    points = []
+    for s in shapes:
+        if isinstance(s, Circle):
+            points += [(s.x - s.radius, s.y - s.radius), (s.x + s.radius, s.y + s.radius)]
+        elif isinstance(s, Rectangle):
+            points += [(s.x, s.y), (s.x + s.width, s.y + s.height)]
+        else:
+            points += [(s.x, s.y), (s.endx, s.endy)]
+    xs, ys = zip(*points)
+
+    assert table.bounding_box() == (min(xs), min(ys), max(xs), max(ys))
+
+
+def test_round_trip_keeps_order_and_values(shapes):
+    restored = ShapeTable.from_shapes(shapes).to_shapes()
+
+    assert [type(s) for s in restored] == [type(s) for s in shapes]
+    assert [vars(s) for s in restored] == [vars(s) for s in shapes]
+
+
+def test_empty_table(backend):
+    table = ShapeTable()
+
+    assert table.area() == 0
+    assert table.total_length() == 0
+    assert table.bounding_box() is None
@@ -0,0 +1,118 @@
+from abc import ABC, abstractmethod
+from datetime import date
+
+import pytest
+
+from visitor_employees import Employee, HourlyEmployee, SalaryEmployee, TempEmployee, Visitor
+
+
+class Contractor(TempEmployee):
+    pass
+
+
+def employees():
+    return [SalaryEmployee(1, "Jan Kowalski", date(2010, 1, 1), 5500),
+            HourlyEmployee(2, "Ewa Nowak", date(2015, 1, 1), 120, 15),
+            TempEmployee(3, "Zenon Nowak", date(2015, 6, 1), date(2016, 6, 1), 2500),
+            Contractor(4, "Anna Nowak", date(2016, 1, 1), date(2017, 1, 1), 3000)]
+
+
+class KindVisitor(Visitor):
+    def visit_SalaryEmployee(self, employee):
+        return 'salary'
+
+    def visit_Employee(self, employee):
+        return 'employee'
+
+
+def test_dispatch_follows_the_node_mro():
+    visitor = KindVisitor()
+    assert [visitor.visit(e) for e in employees()] == ['salary', 'employee', 'employee', 'employee']
+
+
+def test_unknown_node_raises():
+    with pytest.raises(TypeError):
+        KindVisitor().visit(object())
+
+
+def test_visit_many_matches_visit():
+    visitor = KindVisitor()
+    assert visitor.visit_many(employees()) == [visitor.visit(e) for e in employees()]
+
+
+def test_replaced_and_removed_methods_are_seen():
+    class Base(Visitor):
+        def visit_TempEmployee(self, employee):
+            return 'temp'
+
+        def visit_Employee(self, employee):
+            return 'employee'
+
+    class Derived(Base):
+        pass
+
+    contractor = employees()[3]
+    assert Derived().visit(contractor) == 'temp'
+
+    Base.visit_TempEmployee = lambda self, employee: 'replaced'
+    assert Derived().visit(contractor) == 'replaced'
+
+    del Base.visit_TempEmployee
+    assert Derived().visit(contractor) == 'employee'
+
+
+def test_method_added_to_a_mixin_is_seen():
+    class Mixin:
+        pass
+
+    class MixedVisitor(Mixin, KindVisitor):
+        pass
+
+    temp, contractor = employees()[2:]
+    visitor = MixedVisitor()
+    assert visitor.visit_many([temp, contractor]) == ['employee', 'employee']
+
+    Mixin.visit_TempEmployee = lambda self, employee: 'mixin'
+    assert visitor.visit(temp) == visitor.visit(contractor) == 'mixin'
+
+    MixedVisitor.visit_Contractor = lambda self, employee: 'contractor'
+    assert visitor.visit_many([temp, contractor]) == ['mixin', 'contractor']
+
+
+def test_method_added_for_a_node_that_fell_back_to_generic_visit():
+    class Node:
+        pass
+
+    class NodeVisitor(Visitor):
+        pass
+
+    with pytest.raises(TypeError):
+        NodeVisitor().visit(Node())
+
+    NodeVisitor.visit_Node = lambda self, node: 'node'
+    assert NodeVisitor().visit(Node()) == 'node'
+
+
+def test_instance_attribute_overrides_the_method():
+    visitor, other = KindVisitor(), KindVisitor()
+    visitor.visit_Employee = lambda employee: 'instance'
+
+    temp = employees()[2]
+    assert visitor.visit(temp) == 'instance'
+    assert visitor.visit_many([temp]) == ['instance']
+    assert other.visit(temp) == 'employee'
+
+
+def test_visitor_can_be_an_abc():
+    class AbstractVisitor(Visitor, ABC):
+        @abstractmethod
+        def visit_Employee(self, employee):
+            pass
+
+    class ConcreteVisitor(AbstractVisitor):
+        def visit_Employee(self, employee):
+            return employee.id
+
+    with pytest.raises(TypeError):
+        AbstractVisitor()
+    assert ConcreteVisitor().visit_many(employees()) == [1, 2, 3, 4]
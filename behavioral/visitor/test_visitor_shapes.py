@@ -0,0 +1,37 @@
+import math
+
+import pytest
+
+from visitor_shapes import AreaVisitor, Circle, Line, Rectangle
+
+
+class Ring(Circle):
+    pass
+
+
+def shapes():
+    return [Circle(1, 10, 10), Rectangle(5, 6, 20, 2), Line(54, 23, 100, 300), Ring(0, 0, 2), Circle(3, 3, 0.5)]
+
+
+def test_circle_subclass_dispatches_to_the_circle_method():
+    area_visitor = AreaVisitor()
+    area_visitor.visit(Ring(0, 0, 2))
+    assert area_visitor.area == pytest.approx(math.pi * 4)
+
+
+def test_unknown_type_raises():
+    with pytest.raises(KeyError):
+        AreaVisitor().visit(object())
+    with pytest.raises(KeyError):
+        AreaVisitor().visit_all([Circle(0, 0, 1), object()])
+
+
+def test_visit_all_total_matches_visit():
+    area_visitor = AreaVisitor()
+    for s in shapes() * 100:
+        area_visitor.visit(s)
+
+    batched = AreaVisitor()
+    batched.visit_all(shapes() * 100)
+
+    assert batched.area == pytest.approx(area_visitor.area, rel=1e-12)
@@ -46,19 +46,73 @@ class TempEmployee(Employee):
         return self.wage
 
 
+# (visitor class, node class) -> (name of the visiting method, names of the more specific visit_ methods it
+# was resolved without)
+_dispatch_cache = {}
+
+
 class Visitor:
+    """Dispatches visit(node) to visit_<class name> for the first class in the node MRO that has one
+
+    The method name is resolved on the visitor class once per (visitor class,
+    node class) and looked up on the visitor at every call, so a visit_ method
+    replaced on the class, a base or the instance takes effect immediately, and a
+    removed one is resolved again. A cached fallback to a base class method is
+    only used while the visitor class still has none of the more specific visit_
+    methods, so one added later - to the class, a base or a mixin - is picked up too.
+    """
+
     def visit(self, node, *args, **kwargs):
-        visiting_method = None
-        
-        for cls in node.__class__.__mro__:
-            method_name = 'visit_' + cls.__name__
-            visiting_method = getattr(self, method_name, None)
-            if visiting_method:
-                break
-
-        if not visiting_method:
-            visiting_method = self.generic_visit
-        return visiting_method(node, *args, **kwargs)
+        return self._dispatch(type(node))(node, *args, **kwargs)
+
+    def visit_many(self, nodes, *args, **kwargs):
+        """Visit nodes in order - dispatch is looked up once per node class"""
+        methods = {}
+        results = []
+
+        for node in nodes:
+            node_cls = type(node)
+            visiting_method = methods.get(node_cls)
+            if visiting_method is None:
+                visiting_method = methods[node_cls] = self._dispatch(node_cls)
+            results.append(visiting_method(node, *args, **kwargs))
+
+        return results
+
+    def _dispatch(self, node_cls):
+        cls = type(self)
+        key = (cls, node_cls)
+        cached = _dispatch_cache.get(key)
+
+        if cached is not None:
+            name, skipped = cached
+            visiting_method = getattr(self, name, None)
+            if visiting_method is not None:
+                # looked up on the instance: a miss there is much cheaper than on the class
+                for skipped_name in skipped:
+                    if getattr(self, skipped_name, None):
+                        break
+                else:
+                    return visiting_method
+
+        name, _ = _dispatch_cache[key] = self._resolve(node_cls)
+        return getattr(self, name)
+
+    @classmethod
+    def _resolve(cls, node_cls):
+        """Return the name of the visiting method and the names of the visit_ methods missing before it"""
+        skipped = []
+        for base in node_cls.__mro__:
+            name = 'visit_' + base.__name__
+            if getattr(cls, name, None):
+                return name, tuple(skipped)
+            skipped.append(name)
+
+        return 'generic_visit', tuple(skipped)
+
+    @staticmethod
+    def clear_dispatch_cache():
+        _dispatch_cache.clear()
 
     def generic_visit(self, node, *args, **kwargs):
         raise TypeError()
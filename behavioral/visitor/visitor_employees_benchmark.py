@@ -0,0 +1,67 @@
+from datetime import date
+import timeit
+
+from visitor_employees import Visitor, SalaryEmployee, HourlyEmployee, TempEmployee
+
+
+class ReflectiveVisitor:
+    """Visitor.visit before dispatch caching - walks the MRO on every call"""
+
+    def visit(self, node, *args, **kwargs):
+        visiting_method = None
+
+        for cls in node.__class__.__mro__:
+            method_name = 'visit_' + cls.__name__
+            visiting_method = getattr(self, method_name, None)
+            if visiting_method:
+                break
+
+        if not visiting_method:
+            visiting_method = self.generic_visit
+        return visiting_method(node, *args, **kwargs)
+
+    def generic_visit(self, node, *args, **kwargs):
+        raise TypeError()
+
+
+class CountingMixin:
+    def __init__(self):
+        self.count = 0
+
+    def visit_Employee(self, employee):
+        self.count += 1
+
+
+class ReflectiveCountingVisitor(CountingMixin, ReflectiveVisitor):
+    pass
+
+
+class CachedCountingVisitor(CountingMixin, Visitor):
+    pass
+
+
+def main(size=100_000, repeat=5):
+    kinds = [SalaryEmployee(1, "Jan Kowalski", date(2010, 1, 1), 5500),
+             HourlyEmployee(2, "Ewa Nowak", date(2015, 1, 1), 120, 15),
+             TempEmployee(3, "Zenon Nowak", date(2015, 6, 1), date(2016, 6, 1), 2500)]
+    employees = [kinds[i % len(kinds)] for i in range(size)]
+
+    def visit_each(visitor):
+        for e in employees:
+            visitor.visit(e)
+
+    timings = {
+        'reflective visit': lambda: visit_each(ReflectiveCountingVisitor()),
+        'cached visit': lambda: visit_each(CachedCountingVisitor()),
+        'visit_many': lambda: CachedCountingVisitor().visit_many(employees),
+    }
+
+    baseline = None
+    for name, fn in timings.items():
+        elapsed = min(timeit.repeat(fn, number=1, repeat=repeat))
+        baseline = baseline or elapsed
+        print(f'{name:>16}: {elapsed * 1e9 / size:7.1f} ns/visit  x{baseline / elapsed:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -43,22 +43,79 @@ def _declaring_class(obj: object):
 
 # stores the actual visitor methods
 _methods = {}
+_batch_methods = {}
+
+# per visitor class: argument type -> method resolved along both MROs
+_dispatch_tables = {}
+_batch_tables = {}
+
+
+def _resolve(methods, visitor_type, arg_type):
+    for arg_base in arg_type.__mro__:
+        for visitor_base in visitor_type.__mro__:
+            method = methods.get((_qualname(visitor_base), arg_base))
+            if method is not None:
+                return method
+    return None
+
+
+def _lookup(tables, methods, visitor_type, arg_type):
+    table = tables.setdefault(visitor_type, {})
+    method = table[arg_type] = _resolve(methods, visitor_type, arg_type)
+    return method
+
+
+def _register(methods, fn, arg_type):
+    methods[(_declaring_class(fn), arg_type)] = fn
+    _dispatch_tables.clear()
+    _batch_tables.clear()
+
+
+def group_by_type(args):
+    """Group args by their exact type, keeping the order of first occurrence"""
+    groups = {}
+    for arg in args:
+        groups.setdefault(type(arg), []).append(arg)
+    return groups
 
 
 # delegating visitor implementation
 def _visitor_impl(self, arg):
     """Actual visitor implementation"""
-    method = _methods[(_qualname(type(self)), type(arg))]
+    try:
+        method = _dispatch_tables[type(self)][type(arg)]
+    except KeyError:
+        method = _lookup(_dispatch_tables, _methods, type(self), type(arg))
+    if method is None:
+        raise KeyError((_qualname(type(self)), type(arg)))
     return method(self, arg)
 
 
+def visit_all(visitor, args):
+    """Visit args grouped by type - one batch visitor call or one tight loop per type"""
+    visitor_type = type(visitor)
+
+    for arg_type, group in group_by_type(args).items():
+        try:
+            batch = _batch_tables[visitor_type][arg_type]
+        except KeyError:
+            batch = _lookup(_batch_tables, _batch_methods, visitor_type, arg_type)
+
+        if batch is not None:
+            batch(visitor, group)
+            continue
+
+        visit = visitor.visit
+        for arg in group:
+            visit(arg)
+
+
 # visitor decorator
 def visitor(arg_type):
     """Decorator that creates a visitor method"""
 
     def decorator(fn):
-        declaring_class = _declaring_class(fn)
-        _methods[(declaring_class, arg_type)] = fn
+        _register(_methods, fn, arg_type)
 
         # replace all decorated methods with _visitor_impl
         return _visitor_impl
@@ -66,6 +123,18 @@ def visitor(arg_type):
     return decorator
 
 
+# batch visitor decorator
+def batch_visitor(arg_type):
+    """Decorator that creates a visitor method taking a list of arg_type instances"""
+
+    def decorator(fn):
+        _register(_batch_methods, fn, arg_type)
+
+        return visit_all
+
+    return decorator
+
+
 class AreaVisitor:
     def __init__(self):
         self.area = 0.0
@@ -82,6 +151,18 @@ class AreaVisitor:
     def visit(self, line):
         pass
 
+    @batch_visitor(Circle)
+    def visit_all(self, circles):
+        self.area += math.pi * sum(circle.radius ** 2 for circle in circles)
+
+    @batch_visitor(Rectangle)
+    def visit_all(self, rects):
+        self.area += sum(rect.width * rect.height for rect in rects)
+
+    @batch_visitor(Line)
+    def visit_all(self, lines):
+        pass
+
 
 def main():
     shapes = [Circle(1, 10, 10), Rectangle(5, 6, 20, 2), Line(54, 23, 100, 300)]
@@ -93,5 +174,10 @@ def main():
 
     print("areas = {}".format(area_visitor.area))
 
+    area_visitor = AreaVisitor()
+    area_visitor.visit_all(shapes * 1000)
+
+    print("areas (batched) = {}".format(area_visitor.area))
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
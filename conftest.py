@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    """Run a test with NumPy and with the pure Python fallback of the module named by backend_module"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(request.module.backend_module, 'np', None)
+    return request.param
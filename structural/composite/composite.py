@@ -1,34 +1,298 @@
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import count, islice
+import operator
+
+Aggregate = namedtuple('Aggregate', 'value,combine,inverse,zero')
+
+
+_NO_INITIAL = object()
+
+
+def _map_reduce_chunk(fn, combine, leaves, initial=_NO_INITIAL):
+    if initial is _NO_INITIAL:
+        return reduce(combine, map(fn, leaves))
+    return reduce(combine, map(fn, leaves), initial)
+
 
 class Leaf:
+    # reductions over leaves cached by every Composite
+    aggregates = {'leaf_count': Aggregate(lambda leaf: 1, operator.add, operator.sub, 0)}
+    _aggregates_version = 0
+
+    height = 0
+
     def __init__(self, name):
         self.name = name
+        self.parent = None
+        self.handle = None
+        self._version = self._aggregates_version
+        self._totals = None  # computed on first use, once subclasses have set their attributes
+
+    @classmethod
+    def register_aggregate(cls, name, value, combine=operator.add, inverse=operator.sub, zero=0):
+        """Register a reduction of value(leaf) - inverse has to undo combine
+
+        Trees built before are recomputed the next time they are used.
+        """
+        Leaf.aggregates[name] = Aggregate(value, combine, inverse, zero)
+        Leaf._aggregates_version += 1
+
+    @classmethod
+    def unregister_aggregate(cls, name):
+        del Leaf.aggregates[name]
+        Leaf._aggregates_version += 1
+
+    @property
+    def totals(self):
+        self._check_version()
+        if self._totals is None:
+            self._totals = {name: aggregate.value(self) for name, aggregate in self.aggregates.items()}
+        return self._totals
+
+    def invalidate(self):
+        """Recompute the aggregates of the leaf after the values they are computed from changed"""
+        old, self._totals = self._totals, None
+        if self.parent is not None and old is not None:
+            self.parent._check_version()
+            if self._totals is None:  # not recomputed with the whole tree
+                self.parent._changed(old, 'inverse')
+                self.parent._changed(self.totals, 'combine')
+
+    def _check_version(self):
+        if self._version != Leaf._aggregates_version:
+            self._recompute_tree()
+
+    @property
+    def leaf_count(self):
+        return self.totals['leaf_count']
+
+    def _recompute_tree(self):
+        """Recompute the aggregates of every node of the tree holding self"""
+        root = self
+        while root.parent is not None:
+            root = root.parent
+
+        order, stack = [], [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            if isinstance(node, Composite):
+                stack.extend(node._children.values())
+
+        aggregates, version = Leaf.aggregates.items(), Leaf._aggregates_version
+        for node in reversed(order):
+            node._version = version
+            if not isinstance(node, Composite):
+                node._totals = {name: aggregate.value(node) for name, aggregate in aggregates}
+                continue
+
+            totals = {name: aggregate.zero for name, aggregate in aggregates}
+            heights = Counter()
+            for child in node._children.values():
+                for name, aggregate in aggregates:
+                    totals[name] = aggregate.combine(totals[name], child._totals[name])
+                heights[child._height_value()] += 1
+                if isinstance(child, Composite):
+                    child._reported_height = child._height
+                    child._unpushed = None
+            node._totals = totals
+            node._child_heights = heights
+            node._height = 1 + max(heights) if heights else 0
+            node._dirty_children.clear()
+
+    def _height_value(self):
+        return 0
 
     def display(self, alignment = 0):
         print(' ' * alignment + '+ ' + self.name)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['parent'] = None
+        return state
+
 
 class Composite(Leaf):
+    """Node with children
+
+    Every node caches the aggregates of its subtree (totals) and its height.
+    Changes are applied to the node itself and recorded as pending deltas that
+    are pushed to the ancestors when one of them is read, so building a tree in
+    any order costs O(1) amortized per child and a read costs O(nodes changed
+    below the node since the last read).
+    """
+
+    _handles = count()
 
     def __init__(self, name, *children):
         super().__init__(name)
-        self.children = [] + list(children)
+        self._totals = {name: aggregate.zero for name, aggregate in self.aggregates.items()}
+        self._children = {}
+        self._child_heights = Counter()
+        self._height = 0
+        self._reported_height = 0  # height as counted in the parent's _child_heights
+        self._unpushed = None      # change of totals not yet applied to the parent
+        self._dirty_children = set()
+        for child in children:
+            self.add_child(child)
+
+    @property
+    def children(self):
+        return list(self._children.values())
+
+    @property
+    def totals(self):
+        self._flush()
+        return self._totals
+
+    @property
+    def height(self):
+        self._flush()
+        return self._height
+
+    def _height_value(self):
+        return self._height
+
+    def invalidate(self):
+        """Recompute the aggregates of every leaf of the subtree"""
+        for leaf in list(self.leaves()):
+            leaf.invalidate()
 
     def add_child(self, child):
-        self.children.append(child)
+        """Append child and return its handle"""
+        if child.parent is not None:
+            child.parent.remove_child(child)
+
+        self._check_version()
+        child._check_version()
+        if isinstance(child, Composite):
+            child._flush()
+            child._unpushed = None
+            child._reported_height = child._height
+
+        child.parent = self
+        child.handle = next(self._handles)
+        self._children[child.handle] = child
+        self._child_heights[child._height_value()] += 1
+        self._changed(child.totals, 'combine')
+
+        return child.handle
 
     def remove_child(self, child):
-        self.children.remove(child)
+        """Remove a child (or the child with a given handle)"""
+        if isinstance(child, int):
+            child = self._children[child]
+        elif child.parent is not self:
+            raise ValueError(f'{child.name} is not a child of {self.name}')
+
+        self._check_version()
+        self._flush()
+        del self._children[child.handle]
+        child.parent = child.handle = None
+        self._child_heights[child._height_value()] -= 1
+        if not self._child_heights[child._height_value()]:
+            del self._child_heights[child._height_value()]
+        self._changed(child._totals, 'inverse')
+
+    def _changed(self, delta, operation):
+        """Apply delta to the totals, record it for the parent and mark the path to the root dirty"""
+        self._apply(delta, operation)
+        self._height = 1 + max(self._child_heights) if self._child_heights else 0
+
+        node = self
+        while node.parent is not None and node not in node.parent._dirty_children:
+            node.parent._dirty_children.add(node)
+            node = node.parent
+
+    def _apply(self, delta, operation):
+        has_parent = self.parent is not None
+        if has_parent and self._unpushed is None:
+            self._unpushed = {name: aggregate.zero for name, aggregate in self.aggregates.items()}
+
+        for name, aggregate in self.aggregates.items():
+            fn = getattr(aggregate, operation)
+            self._totals[name] = fn(self._totals[name], delta[name])
+            if has_parent:
+                self._unpushed[name] = fn(self._unpushed[name], delta[name])
+
+    def _flush(self):
+        """Push the pending changes of the dirty nodes below self up to self"""
+        self._check_version()
+        if not self._dirty_children:
+            return
+
+        order, stack = [], [self]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node._dirty_children)
+
+        for node in reversed(order):
+            if not node._dirty_children:
+                continue
+            heights = node._child_heights
+            for child in node._dirty_children:
+                if child._unpushed is not None:
+                    node._apply(child._unpushed, 'combine')
+                    child._unpushed = None
+                if child._reported_height != child._height:
+                    heights[child._reported_height] -= 1
+                    if not heights[child._reported_height]:
+                        del heights[child._reported_height]
+                    heights[child._height] += 1
+                    child._reported_height = child._height
+            node._dirty_children.clear()
+            node._height = 1 + max(heights) if heights else 0
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for child in self._children.values():
+            child.parent = self
 
     def display(self, alignment = 0):
-        super().display(alignment)
-        for child in self.children:
-            child.display(alignment + 2)
+        stack = [(self, alignment)]
+        while stack:
+            node, indent = stack.pop()
+            Leaf.display(node, indent)
+            if isinstance(node, Composite):
+                stack.extend((child, indent + 2) for child in reversed(node._children.values()))
 
     def __iter__(self):
-        for child in self.children:
-            yield child
-            if isinstance(child, Composite):
-                yield from child
+        stack = [iter(self._children.values())]
+        while stack:
+            for child in stack[-1]:
+                yield child
+                if isinstance(child, Composite):
+                    stack.append(iter(child._children.values()))
+                    break
+            else:
+                stack.pop()
+
+    def leaves(self):
+        return (node for node in self if not isinstance(node, Composite))
+
+    def map_reduce(self, fn, combine, workers=None, chunk_size=10_000, initial=_NO_INITIAL):
+        """Reduce fn(leaf) over all leaves of the subtree with combine
+
+        initial is placed before the results, as with functools.reduce - without
+        it a subtree with no leaves raises TypeError. With workers > 1 leaves are
+        sent in chunks to a process pool, so fn and combine have to be picklable
+        (e.g. module level functions).
+        """
+        leaves = self.leaves()
+
+        if workers is None or workers <= 1:
+            return _map_reduce_chunk(fn, combine, leaves, initial)
+
+        def chunks():
+            while chunk := list(islice(leaves, chunk_size)):
+                yield chunk
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_map_reduce_chunk, fn, combine, chunk) for chunk in chunks()]
+            return _map_reduce_chunk(lambda future: future.result(), combine, futures, initial)
 
 
 def main():
@@ -0,0 +1,148 @@
+import random
+import time
+
+from composite_interpreter import Number, Variable, Sum, Product
+
+
+class CompiledExpr:
+    """Expression flattened into a single Python function taking env"""
+
+    def __init__(self, expr, source, fn):
+        self.expr = expr
+        self.source = source
+        self.eval = fn
+
+    def __call__(self, env):
+        return self.eval(env)
+
+    def __repr__(self):
+        return f'<CompiledExpr {self.expr!r}>'
+
+
+class _Compiler:
+    def __init__(self):
+        self.namespace = {}
+        self.lines = []
+        self.variables = {}
+        self.temps = {}
+
+    def constant(self, value):
+        name = f'c{len(self.namespace)}'
+        self.namespace[name] = value
+        return name
+
+    def simplify(self, node):
+        """Return a canonical, hashable form of node with constants folded
+
+        Forms: ('num', value), ('var', name), ('sum', terms), ('product', factors), ('node', obj)
+        """
+        if isinstance(node, Number):
+            try:
+                hash(node.value)
+            except TypeError:
+                return ('node', node)
+            return ('num', node.value)
+
+        if isinstance(node, Variable):
+            return ('var', node.varname)
+
+        if isinstance(node, (Sum, Product)):
+            kind = 'sum' if isinstance(node, Sum) else 'product'
+            neutral = 0 if kind == 'sum' else 1
+            constant = neutral
+            operands = []
+
+            for child in node.components:
+                operand = self.simplify(child)
+                if operand[0] == 'num':
+                    constant = constant + operand[1] if kind == 'sum' else constant * operand[1]
+                else:
+                    operands.append(operand)
+
+            if kind == 'product' and constant == 0 and operands:
+                return ('num', 0)
+            if not operands:
+                return ('num', constant)
+            if constant != neutral:
+                operands.append(('num', constant))
+            if len(operands) == 1:
+                return operands[0]
+            return (kind, tuple(operands))
+
+        return ('node', node)
+
+    def emit(self, form):
+        """Emit code computing form once and return the name holding its value"""
+        name = self.temps.get(form) if form[0] != 'node' else None
+        if name is not None:
+            return name
+
+        kind = form[0]
+        if kind == 'num':
+            return self.constant(form[1])
+
+        if kind == 'var':
+            name = self.variables.get(form[1])
+            if name is None:
+                name = self.variables[form[1]] = f'v{len(self.variables)}'
+                self.lines.append(f'{name} = get({self.constant(form[1])}, 0)')
+            return name
+
+        if kind == 'node':
+            name = f't{len(self.lines)}'
+            self.lines.append(f'{name} = {self.constant(form[1])}.eval(env)')
+            return name
+
+        operator = ' + ' if kind == 'sum' else ' * '
+        operands = operator.join(self.emit(operand) for operand in form[1])
+        name = f't{len(self.lines)}'
+        self.lines.append(f'{name} = {operands}')
+        self.temps[form] = name
+
+        return name
+
+    def build(self, expr):
+        result = self.emit(self.simplify(expr))
+        body = ['    get = env.get'] + ['    ' + line for line in self.lines] + [f'    return {result}']
+        source = 'def compiled(env):\n' + '\n'.join(body) + '\n'
+
+        exec(source, self.namespace)
+
+        return CompiledExpr(expr, source, self.namespace['compiled'])
+
+
+def compile(expr):
+    """Compile an interpreter tree into a CompiledExpr
+
+    Constant subexpressions are folded and identical subtrees are evaluated once.
+    """
+    return _Compiler().build(expr)
+
+
+def main():
+    x, y = Variable('x'), Variable('y')
+    shared = Product(Sum(x, Number(1)), y)
+    expr = Sum(Product(Number(2), Number(3), x), shared, Product(shared, shared), Number(1))
+
+    compiled = compile(expr)
+
+    print(expr)
+    print(compiled.source)
+
+    rnd = random.Random(42)
+    envs = [{'x': rnd.randint(0, 100), 'y': rnd.randint(0, 100)} for _ in range(100_000)]
+
+    start = time.perf_counter()
+    expected = [expr.eval(env) for env in envs]
+    interpreted = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [compiled(env) for env in envs]
+    elapsed = time.perf_counter() - start
+
+    assert actual == expected
+    print(f'interpreted: {interpreted:.3f}s, compiled: {elapsed:.3f}s')
+
+
+if __name__ == '__main__':
+    main()
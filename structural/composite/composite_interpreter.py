@@ -47,5 +47,10 @@ class Product:
         return retval
 
 
-expr = Sum(Product(Number(2), Variable('x')), Number(1))
-print(expr.eval({'x': 88}))
+def main():
+    expr = Sum(Product(Number(2), Variable('x')), Number(1))
+    print(expr.eval({'x': 88}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+from operator import add
+
+import pytest
+
+from composite import Leaf, Composite
+
+
+def name_length(leaf):
+    return len(leaf.name)
+
+
+def deep_tree(depth):
+    root = node = Composite('c0')
+    for level in range(1, depth):
+        child = Composite(f'c{level}', Leaf(f'l{level}'))
+        node.add_child(child)
+        node = child
+    return root
+
+
+def test_iteration_is_preorder():
+    root = Composite('root', Leaf('l1'), Composite('c1', Leaf('l2'), Composite('c2', Leaf('l3'))), Leaf('l4'))
+
+    assert [n.name for n in root] == ['l1', 'c1', 'l2', 'c2', 'l3', 'l4']
+    assert [n.name for n in root.leaves()] == ['l1', 'l2', 'l3', 'l4']
+
+
+def test_deep_tree_does_not_hit_recursion_limit(capsys):
+    root = deep_tree(20_000)
+
+    assert sum(1 for _ in root) == 2 * 20_000 - 2
+    root.display()
+    assert capsys.readouterr().out.count('\n') == 2 * 20_000 - 1
+
+
+def test_map_reduce_in_process_pool_matches_sequential():
+    root = deep_tree(5_000)
+    for i in range(10_000):
+        root.add_child(Leaf(f'leaf{i}'))
+
+    expected = sum(len(leaf.name) for leaf in root.leaves())
+
+    assert root.map_reduce(name_length, add) == expected
+    assert root.map_reduce(name_length, add, workers=2, chunk_size=1_000) == expected
+
+
+def test_map_reduce_of_tree_without_leaves():
+    root = Composite('root', Composite('empty'))
+
+    assert root.map_reduce(name_length, add, initial=0) == 0
+    assert root.map_reduce(name_length, add, workers=2, initial=0) == 0
+    with pytest.raises(TypeError):
+        root.map_reduce(name_length, add)
+
+    root.add_child(Leaf('abc'))
+    assert root.map_reduce(name_length, add, initial=10) == 13
+    assert root.map_reduce(name_length, add, workers=2, initial=10) == 13
+
+
+def test_aggregates_are_maintained_on_add_and_remove():
+    Leaf.register_aggregate('name_length', name_length)
+    try:
+        c2 = Composite('c2', Leaf('l3'))
+        c1 = Composite('c1', Leaf('l2'), c2)
+        root = Composite('root', Leaf('l1'), c1)
+
+        assert (root.leaf_count, root.height, root.totals['name_length']) == (3, 3, 6)
+
+        handle = c2.add_child(Composite('c3', Leaf('leaf4')))
+        assert (root.leaf_count, root.height, root.totals['name_length']) == (4, 4, 11)
+
+        c2.remove_child(handle)
+        root.remove_child(c1)
+        assert (root.leaf_count, root.height, root.totals['name_length']) == (1, 1, 2)
+        assert (c1.leaf_count, c1.height) == (2, 2)
+    finally:
+        Leaf.unregister_aggregate('name_length')
+
+
+def test_removing_many_children_by_handle():
+    root = Composite('root')
+    handles = [root.add_child(Leaf(f'l{i}')) for i in range(100_000)]
+
+    for handle in handles[::2]:
+        root.remove_child(handle)
+
+    assert root.leaf_count == 50_000
+    assert [leaf.name for leaf in root][:2] == ['l1', 'l3']
+
+
+def test_deep_tree_built_top_down_keeps_aggregates():
+    root = deep_tree(20_000)
+    assert (root.leaf_count, root.height) == (19_999, 20_000)
+
+    node = root
+    while isinstance(node.children[-1], Composite):
+        node = node.children[-1]
+    node.add_child(Composite('deepest', Leaf('l')))
+    assert (root.leaf_count, root.height) == (20_000, 20_001)
+    assert (node.parent.leaf_count, node.parent.height) == (3, 3)
+
+    node.parent.remove_child(node)
+    assert (root.leaf_count, root.height) == (19_998, 19_999)
+
+
+def test_aggregate_registered_after_the_tree_was_built():
+    c1 = Composite('c1', Leaf('ab'))
+    root = Composite('root', Leaf('abc'), c1)
+    Leaf.register_aggregate('name_length', name_length)
+    try:
+        root.add_child(Leaf('abcd'))
+        assert root.totals['name_length'] == 9
+        assert c1.totals['name_length'] == 2
+        c1.add_child(Leaf('x'))
+        assert root.totals['name_length'] == 10
+    finally:
+        Leaf.unregister_aggregate('name_length')
+    assert root.leaf_count == 4
+
+
+def test_children_is_a_list_copy():
+    root = Composite('root', Leaf('l1'), Leaf('l2'), Leaf('l3'))
+
+    assert root.children[0].name == 'l1'
+    for child in root.children:
+        root.remove_child(child)
+    assert root.children == [] and root.leaf_count == 0
+
+
+class File(Leaf):
+    def __init__(self, name, size):
+        super().__init__(name)
+        self.size = size
+
+
+def test_subclass_values_and_invalidate():
+    Leaf.register_aggregate('size', lambda leaf: leaf.size)
+    try:
+        big, small = File('big', 100), File('small', 5)
+        root = Composite('root', Composite('dir', big), small)
+        assert root.totals['size'] == 105
+
+        big.size = 40
+        big.invalidate()
+        assert root.totals['size'] == 45
+        assert root.children[0].totals['size'] == 40
+
+        big.size, small.size = 1, 2
+        root.invalidate()
+        assert root.totals['size'] == 3
+    finally:
+        Leaf.unregister_aggregate('size')
@@ -0,0 +1,36 @@
+from array import array
+
+import pytest
+
+import composite_batch
+from composite_batch import eval_batch
+from composite_interpreter import Number, Variable, Sum, Product
+
+EXPR = Sum(Product(Number(2), Variable('x')), Product(Variable('x'), Variable('y')), Number(1))
+COLUMNS = {'x': array('d', [0.0, 1.0, 2.5, -3.0]), 'y': array('d', [1.0, 2.0, 4.0, 0.5])}
+
+backend_module = composite_batch
+
+
+def expected(expr, columns):
+    rows = zip(*columns.values())
+    return [expr.eval(dict(zip(columns, row))) for row in rows]
+
+
+def test_eval_batch_matches_row_by_row_eval(backend):
+    assert list(eval_batch(EXPR, COLUMNS)) == expected(EXPR, COLUMNS)
+
+
+def test_missing_variables_evaluate_to_zero(backend):
+    expr = Sum(Variable('x'), Variable('z'))
+
+    assert list(eval_batch(expr, COLUMNS)) == list(COLUMNS['x'])
+
+
+def test_constant_expression_is_broadcast(backend):
+    assert list(eval_batch(Sum(Number(1), Number(2)), COLUMNS)) == [3, 3, 3, 3]
+
+
+def test_columns_of_different_length_are_rejected(backend):
+    with pytest.raises(ValueError):
+        eval_batch(EXPR, {'x': array('d', [1.0]), 'y': array('d', [1.0, 2.0])})
@@ -0,0 +1,43 @@
+import random
+
+import composite_compiler
+from composite_interpreter import Number, Variable, Sum, Product
+
+
+def random_expr(rnd, depth):
+    if depth == 0 or rnd.random() < 0.3:
+        if rnd.random() < 0.5:
+            return Number(rnd.randint(-3, 3))
+        return Variable(rnd.choice('xyz'))
+
+    node_type = rnd.choice([Sum, Product])
+    return node_type(*(random_expr(rnd, depth - 1) for _ in range(rnd.randint(1, 3))))
+
+
+def test_compiled_matches_interpreter():
+    rnd = random.Random(1)
+
+    for _ in range(200):
+        expr = random_expr(rnd, 5)
+        compiled = composite_compiler.compile(expr)
+
+        for _ in range(10):
+            env = {name: rnd.randint(-5, 5) for name in 'xy'}
+            assert compiled(env) == expr.eval(env)
+
+
+def test_constants_are_folded():
+    compiled = composite_compiler.compile(Sum(Product(Number(2), Number(3)), Number(1)))
+
+    assert compiled({}) == 7
+    assert '+' not in compiled.source and '*' not in compiled.source
+
+
+def test_identical_subtrees_are_evaluated_once():
+    shared = Product(Variable('x'), Variable('y'))
+    expr = Sum(shared, Product(Variable('x'), Variable('y')))
+
+    compiled = composite_compiler.compile(expr)
+
+    assert compiled({'x': 2, 'y': 5}) == 20
+    assert compiled.source.count('*') == 1
@@ -4,33 +4,59 @@ from collections import namedtuple
 from enum import Enum
 import sys
 
+from flyweight_pool import FlyweightPool
+
 TreeSprites = ['pine.bmp', 'chestnut.bmp', 'oak.bmp']
 
 Coord = namedtuple('Coord', 'x,y')
 
 
 class TreeFlyweight:
-    pool = dict()
+    # bitmaps not in use are kept until they take more than max_bytes - see configure_pool
+    pool = FlyweightPool(max_bytes=64 * 2**20, sizeof=lambda flyweight: flyweight.nbytes)
 
     def __new__(cls, path):
-        self = cls.pool.get(path, None)
-
-        if self is None:
-            self = object.__new__(cls)
-            cls.pool[path] = self
-            self.__bmp = cls.load(path)
+        return cls.pool.get(path, cls._create)
 
+    @classmethod
+    def _create(cls, path):
+        self = object.__new__(cls)
+        self.__bmp = cls.load(path)
         return self
 
+    @classmethod
+    def configure_pool(cls, max_bytes):
+        cls.pool.resize(max_bytes)
+
+    @classmethod
+    def preload(cls, paths, executor=None):
+        return cls.pool.preload(paths, cls._create, executor)
+
+    @classmethod
+    async def apreload(cls, paths, executor=None):
+        return await cls.pool.apreload(paths, cls._create, executor)
+
     @classmethod
     def load(cls, path):
         print(f'Loading bitmap from {path}')
 
         return "***" + path + "***"
 
+    @property
+    def bitmap(self):
+        return self.__bmp
+
+    @property
+    def nbytes(self):
+        return sys.getsizeof(self.__bmp)
+
     def render(self, coord):
         print(f'Rendering {self.__bmp}#{id(self)} at ({coord.x}, {coord.y})')
 
+    def render_batch(self, xs, ys):
+        for x, y in zip(xs, ys):
+            print(f'Rendering {self.__bmp}#{id(self)} at ({x}, {y})')
+
 
 @dataclass
 class TreeSprite:
@@ -50,6 +76,8 @@ def main():
 
     forest = []
 
+    TreeFlyweight.preload(TreeSprites)
+
     # creation of forest
     for _ in range(30):
         rnd_index = rnd.randint(0, len(TreeSprites)-1)
@@ -0,0 +1,92 @@
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from flyweight import TreeFlyweight, TreeSprite, TreeSprites, Coord
+from flyweight_forest import Forest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Canvas:
+    """Stand-in for a real blitter - accumulates a checksum instead of drawing"""
+
+    def __init__(self):
+        self.checksum = 0
+
+    def draw(self, bitmap, coord):
+        self.checksum += coord.x + coord.y
+
+    def draw_batch(self, bitmap, xs, ys):
+        if np is not None:
+            self.checksum += int(np.asarray(xs).sum()) + int(np.asarray(ys).sum())
+        else:
+            self.checksum += sum(xs) + sum(ys)
+
+
+def random_trees(size, seed=42):
+    rnd = random.Random(seed)
+    for _ in range(size):
+        yield TreeSprites[rnd.randrange(len(TreeSprites))], rnd.randrange(101), rnd.randrange(101)
+
+
+def build_list(size):
+    return [TreeSprite(TreeFlyweight(path), Coord(x, y)) for path, x, y in random_trees(size)]
+
+
+def build_forest(size):
+    forest = Forest()
+    for path, x, y in random_trees(size):
+        forest.plant(path, x, y)
+    return forest
+
+
+def render_list(forest, canvas):
+    for tree in forest:
+        canvas.draw(tree.bitmap, tree.coord)
+
+
+def render_forest(forest, canvas):
+    forest.render_batch(canvas.draw_batch)
+
+
+def measure(build, render, size):
+    gc.collect()
+    tracemalloc.start()
+    forest = build(size)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    canvas = Canvas()
+    start = time.perf_counter()
+    render(forest, canvas)
+    elapsed = time.perf_counter() - start
+
+    return memory, elapsed, canvas.checksum
+
+
+def main(sizes):
+    # warm the flyweight pool so that bitmap loading is not measured
+    for path in TreeSprites:
+        TreeFlyweight(path)
+
+    print(f"{'trees':>10} {'approach':>10} {'memory [MB]':>12} {'B/tree':>8} {'render [s]':>11}")
+
+    for size in sizes:
+        results = {}
+        for name, build, render in (('list', build_list, render_list),
+                                    ('forest', build_forest, render_forest)):
+            memory, elapsed, checksum = measure(build, render, size)
+            results[name] = checksum
+            print(f'{size:>10} {name:>10} {memory / 2**20:>12.1f} {memory / size:>8.1f} {elapsed:>11.4f}')
+
+        assert results['list'] == results['forest']
+
+
+if __name__ == '__main__':
+    main([int(float(arg)) for arg in sys.argv[1:]] or [10**4, 10**6, 10**7])
@@ -0,0 +1,138 @@
+from array import array
+import random
+
+from flyweight import TreeFlyweight, TreeSprite, TreeSprites, Coord
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Forest:
+    """Stores trees as parallel typed arrays: flyweight id, x and y"""
+
+    def __init__(self):
+        self._flyweights = []
+        self._flyweight_ids = {}
+        self.kinds = array('H')
+        self.xs = array('i')
+        self.ys = array('i')
+
+    def intern(self, flyweight):
+        """Return the small integer id of a flyweight, registering it on first use"""
+        flyweight_id = self._flyweight_ids.get(flyweight)
+
+        if flyweight_id is None:
+            flyweight_id = len(self._flyweights)
+            self._flyweights.append(flyweight)
+            self._flyweight_ids[flyweight] = flyweight_id
+
+        return flyweight_id
+
+    def plant(self, flyweight, x, y):
+        if not isinstance(flyweight, TreeFlyweight):
+            flyweight = TreeFlyweight(flyweight)
+
+        self.kinds.append(self.intern(flyweight))
+        self.xs.append(x)
+        self.ys.append(y)
+
+        return len(self.kinds) - 1
+
+    def flyweight(self, flyweight_id):
+        return self._flyweights[flyweight_id]
+
+    @property
+    def flyweights(self):
+        return tuple(self._flyweights)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        return TreeSprite(self._flyweights[self.kinds[index]],
+                          Coord(self.xs[index], self.ys[index]))
+
+    def __iter__(self):
+        flyweights = self._flyweights
+        for kind, x, y in zip(self.kinds, self.xs, self.ys):
+            yield TreeSprite(flyweights[kind], Coord(x, y))
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.kinds, self.xs, self.ys))
+
+    def groups(self):
+        """Yield (flyweight, xs, ys) with coordinates of all trees sharing a flyweight"""
+        if np is not None:
+            yield from self._groups_numpy()
+            return
+
+        xs_by_kind = [array('i') for _ in self._flyweights]
+        ys_by_kind = [array('i') for _ in self._flyweights]
+        for kind, x, y in zip(self.kinds, self.xs, self.ys):
+            xs_by_kind[kind].append(x)
+            ys_by_kind[kind].append(y)
+
+        for flyweight, xs, ys in zip(self._flyweights, xs_by_kind, ys_by_kind):
+            if xs:
+                yield flyweight, xs, ys
+
+    def _groups_numpy(self):
+        if not self.kinds:
+            return
+
+        kinds = np.frombuffer(self.kinds, dtype=np.uint16)
+        xs = np.frombuffer(self.xs, dtype=np.int32)
+        ys = np.frombuffer(self.ys, dtype=np.int32)
+
+        order = np.argsort(kinds, kind='stable')
+        counts = np.bincount(kinds, minlength=len(self._flyweights))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+
+        for flyweight_id, flyweight in enumerate(self._flyweights):
+            start, stop = bounds[flyweight_id], bounds[flyweight_id + 1]
+            if start != stop:
+                selected = order[start:stop]
+                yield flyweight, xs[selected], ys[selected]
+
+    def render(self):
+        for tree in self:
+            tree.render()
+
+    def render_batch(self, draw=None):
+        """Render trees grouped by flyweight - one draw call per flyweight"""
+        for flyweight, xs, ys in self.groups():
+            if draw is None:
+                flyweight.render_batch(xs, ys)
+            else:
+                draw(flyweight, xs, ys)
+
+
+def plant_random_forest(size, seed=None):
+    rnd = random.Random(seed)
+    min_point, max_point = 0, 100
+
+    forest = Forest()
+
+    for _ in range(size):
+        path = TreeSprites[rnd.randint(0, len(TreeSprites)-1)]
+        forest.plant(path, rnd.randint(min_point, max_point), rnd.randint(min_point, max_point))
+
+    return forest
+
+
+def main():
+    forest = plant_random_forest(30)
+
+    print('-' * 40)
+
+    forest.render_batch()
+
+    print('-' * 40)
+
+    print(f'{len(forest)} trees, {len(forest.flyweights)} flyweights, {forest.nbytes()} bytes of coords')
+
+
+if __name__ == '__main__':
+    main()
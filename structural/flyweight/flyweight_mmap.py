@@ -0,0 +1,66 @@
+import mmap
+import os
+import tempfile
+
+from flyweight import TreeFlyweight, Coord
+from flyweight_pool import FlyweightPool
+
+
+class MappedBitmap:
+    """Read-only memory map of an already decoded sprite file
+
+    Pages of the mapping come from the OS page cache, so every process
+    mapping the same file shares them instead of holding a private copy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def data(self):
+        return memoryview(self._mmap)
+
+    def __len__(self):
+        return len(self._mmap)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + len(self._mmap)
+
+    def __str__(self):
+        return f'mmap:{self.path}[{len(self)}B]'
+
+    def close(self):
+        self._mmap.close()
+
+
+class MappedTreeFlyweight(TreeFlyweight):
+    pool = FlyweightPool(sizeof=lambda flyweight: flyweight.nbytes)
+
+    @classmethod
+    def load(cls, path):
+        print(f'Mapping bitmap from {path}')
+
+        return MappedBitmap(path)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as sprites_dir:
+        paths = []
+        for name in ('pine.raw', 'chestnut.raw', 'oak.raw'):
+            path = os.path.join(sprites_dir, name)
+            with open(path, 'wb') as f:
+                f.write(os.urandom(64 * 64 * 4))
+            paths.append(path)
+
+        sprites = MappedTreeFlyweight.preload(paths)
+
+        for sprite in sprites:
+            sprite.render(Coord(10, 20))
+
+        print(MappedTreeFlyweight.pool.stats)
+
+
+if __name__ == '__main__':
+    main()
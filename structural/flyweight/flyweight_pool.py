@@ -0,0 +1,142 @@
+import asyncio
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import threading
+import weakref
+
+# waits: lookups that found the key being loaded by another thread and waited for that load
+PoolStats = namedtuple('PoolStats', 'hits,misses,waits,evictions,entries,nbytes')
+
+
+class _PendingLoad:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def result(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class FlyweightPool:
+    """Thread-safe flyweight pool
+
+    * a miss for a key that is already being loaded waits for that load (single-flight)
+    * strongly held entries are evicted in LRU order when max_bytes is exceeded
+    * evicted flyweights are still found via weak references while somebody uses them
+    """
+
+    def __init__(self, max_bytes=None, sizeof=sys.getsizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._in_use = weakref.WeakValueDictionary()
+        self._pending = {}
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._evictions = 0
+
+    def get(self, key, factory):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+
+            value = self._in_use.get(key)
+            if value is not None:
+                self._hits += 1
+                self._admit(key, value)
+                return value
+
+            pending = self._pending.get(key)
+            loading = pending is None
+            if loading:
+                self._misses += 1
+                pending = self._pending[key] = _PendingLoad()
+            else:
+                self._waits += 1
+
+        if not loading:
+            return pending.result()
+
+        # waiters must be released whatever fails - the factory, the weak reference or sizeof
+        try:
+            value = factory(key)
+            with self._lock:
+                self._in_use[key] = value
+                self._admit(key, value)
+            pending.value = value
+        except BaseException as error:
+            pending.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.done.set()
+
+        return value
+
+    def preload(self, keys, factory, executor=None):
+        """Load keys in parallel on executor (a fresh thread pool by default)"""
+        if executor is None:
+            with ThreadPoolExecutor() as executor:
+                return self.preload(keys, factory, executor)
+
+        return list(executor.map(lambda key: self.get(key, factory), keys))
+
+    async def apreload(self, keys, factory, executor=None):
+        """Load keys concurrently from a coroutine without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+
+        return await asyncio.gather(*(loop.run_in_executor(executor, self.get, key, factory)
+                                      for key in keys))
+
+    def _admit(self, key, value):
+        size = self.sizeof(value)
+        self._entries[key] = (value, size)
+        self._nbytes += size
+        self._evict()
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+
+        while self._nbytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._nbytes -= evicted_size
+            self._evictions += 1
+
+    def resize(self, max_bytes):
+        """Change the budget, evicting entries if the pool is now over it - None means unbounded"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries or key in self._in_use
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._in_use.clear()
+            self._nbytes = 0
+
+    @property
+    def stats(self):
+        with self._lock:
+            return PoolStats(self._hits, self._misses, self._waits, self._evictions,
+                             len(self._entries), self._nbytes)
@@ -0,0 +1,124 @@
+from array import array
+from collections import defaultdict, namedtuple
+import random
+
+from flyweight import TreeSprites
+from flyweight_forest import Forest
+
+Rect = namedtuple('Rect', 'left,top,right,bottom')
+
+
+class GridIndex:
+    """Uniform grid over integer coordinates - each cell keeps an insertion-ordered set of ids"""
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self._cells = defaultdict(dict)
+
+    def _cell(self, x, y):
+        return x // self.cell_size, y // self.cell_size
+
+    def insert(self, item, x, y):
+        self._cells[self._cell(x, y)][item] = None
+
+    def remove(self, item, x, y):
+        cell = self._cell(x, y)
+        items = self._cells[cell]
+        del items[item]
+        if not items:
+            del self._cells[cell]
+
+    def candidates(self, rect):
+        """Yield ids from all cells overlapping rect (may include ids outside of it)"""
+        left, top = self._cell(rect.left, rect.top)
+        right, bottom = self._cell(rect.right, rect.bottom)
+        cells = self._cells
+
+        if (right - left + 1) * (bottom - top + 1) > len(cells):
+            for (cx, cy), items in cells.items():
+                if left <= cx <= right and top <= cy <= bottom:
+                    yield from items
+            return
+
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                items = cells.get((cx, cy))
+                if items:
+                    yield from items
+
+
+class SpatialForest(Forest):
+    """Forest that keeps a grid index of its trees so a viewport is rendered in O(visible trees)"""
+
+    def __init__(self, cell_size=64):
+        super().__init__()
+        self.index = GridIndex(cell_size)
+
+    def plant(self, flyweight, x, y):
+        tree = super().plant(flyweight, x, y)
+        self.index.insert(tree, x, y)
+        return tree
+
+    def remove(self, tree):
+        """Remove a tree by moving the last one into its slot - returns the moved tree's old index"""
+        last = len(self) - 1
+        self.index.remove(tree, self.xs[tree], self.ys[tree])
+
+        if tree != last:
+            self.index.remove(last, self.xs[last], self.ys[last])
+            self.kinds[tree] = self.kinds[last]
+            self.xs[tree] = self.xs[last]
+            self.ys[tree] = self.ys[last]
+            self.index.insert(tree, self.xs[tree], self.ys[tree])
+
+        del self.kinds[last]
+        del self.xs[last]
+        del self.ys[last]
+
+        return last
+
+    def query(self, rect):
+        xs, ys = self.xs, self.ys
+
+        return [tree for tree in self.index.candidates(rect)
+                if rect.left <= xs[tree] <= rect.right and rect.top <= ys[tree] <= rect.bottom]
+
+    def render_viewport(self, rect, draw=None):
+        """Render visible trees grouped by flyweight - one draw call per flyweight"""
+        xs_by_kind = defaultdict(lambda: array('i'))
+        ys_by_kind = defaultdict(lambda: array('i'))
+
+        for tree in self.query(rect):
+            kind = self.kinds[tree]
+            xs_by_kind[kind].append(self.xs[tree])
+            ys_by_kind[kind].append(self.ys[tree])
+
+        for kind in sorted(xs_by_kind):
+            flyweight = self.flyweight(kind)
+            if draw is None:
+                flyweight.render_batch(xs_by_kind[kind], ys_by_kind[kind])
+            else:
+                draw(flyweight, xs_by_kind[kind], ys_by_kind[kind])
+
+
+def main():
+    rnd = random.Random()
+    forest = SpatialForest(cell_size=16)
+
+    for _ in range(1000):
+        path = TreeSprites[rnd.randint(0, len(TreeSprites)-1)]
+        forest.plant(path, rnd.randint(0, 1000), rnd.randint(0, 1000))
+
+    viewport = Rect(100, 100, 150, 150)
+
+    print('-' * 40)
+
+    forest.render_viewport(viewport)
+
+    print('-' * 40)
+
+    print(f'{len(forest.query(viewport))} of {len(forest)} trees visible in {viewport}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import pytest
+
+import flyweight_forest
+from flyweight import TreeFlyweight, TreeSprites
+from flyweight_forest import Forest, plant_random_forest
+
+backend_module = flyweight_forest
+
+
+def rendered_lines(capsys, render):
+    render()
+    return sorted(capsys.readouterr().out.splitlines())
+
+
+def test_render_batch_matches_per_tree_rendering(backend, capsys):
+    forest = plant_random_forest(500, seed=3)
+    capsys.readouterr()
+
+    assert rendered_lines(capsys, forest.render_batch) == rendered_lines(capsys, forest.render)
+
+
+def test_render_batch_draws_each_flyweight_once_in_planting_order(backend):
+    forest = plant_random_forest(300, seed=4)
+    calls = []
+
+    forest.render_batch(lambda flyweight, xs, ys: calls.append((flyweight, list(xs), list(ys))))
+
+    assert len(calls) == len({flyweight for flyweight, _, _ in calls}) == len(forest.flyweights)
+    for flyweight, xs, ys in calls:
+        trees = [tree for tree in forest if tree.bitmap is flyweight]
+        assert xs == [tree.coord.x for tree in trees]
+        assert ys == [tree.coord.y for tree in trees]
+
+
+def test_render_batch_skips_unused_and_empty(backend):
+    forest = Forest()
+    forest.render_batch(lambda *args: pytest.fail('nothing should be drawn'))
+
+    unused = forest.intern(TreeFlyweight(TreeSprites[0]))
+    forest.plant(TreeSprites[1], -5, 7)
+    calls = []
+    forest.render_batch(lambda flyweight, xs, ys: calls.append((flyweight, list(xs), list(ys))))
+
+    assert calls == [(forest.flyweight(unused + 1), [-5], [7])]
+
+
+def test_trees_are_stored_as_interned_ids(backend):
+    forest = Forest()
+    first = forest.plant(TreeSprites[0], 1, 2)
+    forest.plant(TreeSprites[1], 3, 4)
+    forest.plant(TreeFlyweight(TreeSprites[0]), 5, 6)
+
+    assert len(forest) == 3 and len(forest.flyweights) == 2
+    assert list(forest.kinds) == [0, 1, 0]
+    assert forest[first].bitmap is forest[2].bitmap is forest.flyweight(0)
+    assert (forest[2].coord.x, forest[2].coord.y) == (5, 6)
+    assert forest.nbytes() == 3 * (2 + 4 + 4)
@@ -0,0 +1,173 @@
+import asyncio
+import gc
+import threading
+import time
+
+from flyweight_pool import FlyweightPool
+from flyweight_mmap import MappedTreeFlyweight
+
+
+class Sprite:
+    def __init__(self, path, nbytes=10):
+        self.path = path
+        self.nbytes = nbytes
+
+
+def test_concurrent_misses_load_once():
+    pool = FlyweightPool()
+    loads = []
+
+    def slow_load(path):
+        loads.append(path)
+        time.sleep(0.05)
+        return Sprite(path)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.get('oak.bmp', slow_load)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loads == ['oak.bmp']
+    assert all(sprite is results[0] for sprite in results)
+    assert pool.stats.misses == 1
+    assert pool.stats.waits == 7
+    assert pool.stats.hits == 0
+
+
+def test_lru_eviction_respects_byte_budget():
+    pool = FlyweightPool(max_bytes=20, sizeof=lambda sprite: sprite.nbytes)
+
+    pool.get('a', Sprite)
+    pool.get('b', Sprite)
+    pool.get('a', Sprite)
+    pool.get('c', Sprite)
+    gc.collect()
+
+    assert 'b' not in pool
+    assert 'a' in pool and 'c' in pool
+    assert pool.stats.evictions == 1
+    assert pool.stats.nbytes == 20
+
+
+def test_resize_evicts_down_to_the_new_budget():
+    pool = FlyweightPool(sizeof=lambda sprite: sprite.nbytes)
+    for key in 'abc':
+        pool.get(key, Sprite)
+    gc.collect()
+
+    pool.resize(10)
+    gc.collect()
+    assert 'c' in pool and 'a' not in pool and 'b' not in pool
+    assert pool.stats.nbytes == 10
+
+
+def test_tree_flyweight_pool_is_bounded():
+    from flyweight import TreeFlyweight
+    assert TreeFlyweight.pool.max_bytes is not None
+
+
+def test_evicted_flyweight_in_use_is_not_reloaded():
+    pool = FlyweightPool(max_bytes=10, sizeof=lambda sprite: sprite.nbytes)
+
+    a = pool.get('a', Sprite)
+    pool.get('b', Sprite)
+
+    assert pool.stats.evictions == 1
+    assert pool.get('a', Sprite) is a
+    assert pool.stats.misses == 2
+
+
+def test_failed_load_is_not_cached():
+    pool = FlyweightPool()
+
+    def broken(path):
+        raise IOError(path)
+
+    try:
+        pool.get('a', broken)
+    except IOError:
+        pass
+
+    assert pool.get('a', Sprite).path == 'a'
+    assert pool.stats.misses == 2
+
+
+def test_waiters_are_released_when_the_loaded_value_cannot_be_admitted():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load(path):
+        started.set()
+        release.wait()
+        return [path]  # lists cannot be weakly referenced
+
+    pool = FlyweightPool()
+    errors = []
+
+    def get():
+        try:
+            pool.get('a', slow_load)
+        except TypeError as error:
+            errors.append(error)
+
+    loader = threading.Thread(target=get)
+    loader.start()
+    started.wait()
+    waiter = threading.Thread(target=get)
+    waiter.start()
+    while not pool.stats.waits:
+        time.sleep(0.001)
+    release.set()
+    loader.join(5)
+    waiter.join(5)
+
+    assert not loader.is_alive() and not waiter.is_alive()
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert pool.get('a', Sprite).path == 'a'
+
+
+def test_waiters_are_released_when_sizeof_fails():
+    def sizeof(sprite):
+        raise ValueError(sprite.path)
+
+    pool = FlyweightPool(sizeof=sizeof)
+
+    try:
+        pool.get('a', Sprite)
+    except ValueError:
+        pass
+
+    assert 'a' not in pool._pending
+    assert pool.stats.entries == 0
+
+
+def test_preload_warms_pool_from_thread_pool():
+    pool = FlyweightPool()
+
+    sprites = pool.preload(['a', 'b', 'a', 'c'], Sprite)
+
+    assert [s.path for s in sprites] == ['a', 'b', 'a', 'c']
+    assert sprites[0] is sprites[2]
+    assert pool.stats.misses == 3
+
+
+def test_apreload_warms_pool_from_event_loop():
+    pool = FlyweightPool()
+
+    sprites = asyncio.run(pool.apreload(['a', 'b'], Sprite))
+
+    assert [s.path for s in sprites] == ['a', 'b']
+    assert pool.get('a', Sprite) is sprites[0]
+
+
+def test_mapped_flyweight_shares_file_pages(tmp_path):
+    path = tmp_path / 'pine.raw'
+    path.write_bytes(b'\x01\x02\x03\x04' * 16)
+
+    sprite = MappedTreeFlyweight(str(path))
+
+    assert bytes(sprite.bitmap.data[:4]) == b'\x01\x02\x03\x04'
+    assert len(sprite.bitmap) == 64
+    assert MappedTreeFlyweight(str(path)) is sprite
@@ -0,0 +1,53 @@
+import random
+
+from flyweight import TreeSprites
+from flyweight_spatial import SpatialForest, Rect
+
+
+def brute_force(forest, rect):
+    return sorted(tree for tree in range(len(forest))
+                  if rect.left <= forest.xs[tree] <= rect.right
+                  and rect.top <= forest.ys[tree] <= rect.bottom)
+
+
+def random_forest(rnd, size):
+    forest = SpatialForest(cell_size=8)
+    for _ in range(size):
+        forest.plant(rnd.choice(TreeSprites), rnd.randint(-50, 200), rnd.randint(-50, 200))
+    return forest
+
+
+def test_query_matches_brute_force():
+    rnd = random.Random(7)
+    forest = random_forest(rnd, 2000)
+
+    for _ in range(50):
+        left, top = rnd.randint(-60, 200), rnd.randint(-60, 200)
+        rect = Rect(left, top, left + rnd.randint(0, 100), top + rnd.randint(0, 100))
+
+        assert sorted(forest.query(rect)) == brute_force(forest, rect)
+
+
+def test_remove_keeps_index_consistent():
+    rnd = random.Random(11)
+    forest = random_forest(rnd, 500)
+    everything = Rect(-100, -100, 300, 300)
+
+    for _ in range(300):
+        forest.remove(rnd.randrange(len(forest)))
+
+    assert len(forest) == 200
+    assert sorted(forest.query(everything)) == list(range(200))
+
+
+def test_render_viewport_draws_only_visible_trees():
+    forest = SpatialForest()
+    forest.plant(TreeSprites[0], 10, 10)
+    forest.plant(TreeSprites[1], 12, 11)
+    forest.plant(TreeSprites[0], 500, 500)
+
+    drawn = []
+    forest.render_viewport(Rect(0, 0, 100, 100),
+                           lambda flyweight, xs, ys: drawn.append((flyweight, list(xs), list(ys))))
+
+    assert drawn == [(forest.flyweight(0), [10], [10]), (forest.flyweight(1), [12], [11])]